@@ -0,0 +1,11 @@
+import os
+
+os.environ.setdefault("KPOISK_TELEGRAM_TOKEN", "42:BENCHMARK")
+os.environ.setdefault("KPOISK_API_TOKEN", "benchmark")
+# The stand-in API has no limits, don't let ours shape the measurements
+os.environ.setdefault("KPOISK_SEARCH_RATE", "1000000")
+os.environ.setdefault("KPOISK_SEARCH_BURST", "1000000")
+os.environ.setdefault("KPOISK_FILM_RATE", "1000000")
+os.environ.setdefault("KPOISK_FILM_BURST", "1000000")
+os.environ.setdefault("KPOISK_API_DAILY_QUOTA", "1000000000")
+os.environ.setdefault("KPOISK_INLINE_DEBOUNCE", "0")
@@ -0,0 +1,154 @@
+"""
+Deterministic corpus of API responses resembling the real ones: titles of
+varied length, missing posters and ratings, long descriptions and so on.
+"""
+
+import random
+from typing import Any, Dict, List
+
+GENRES = [
+    "драма",
+    "комедия",
+    "боевик",
+    "триллер",
+    "фантастика",
+    "мелодрама",
+    "ужасы",
+    "мультфильм",
+    "детектив",
+    "приключения",
+]
+COUNTRIES = ["США", "Россия", "Франция", "Великобритания", "Япония", "Корея Южная"]
+WORDS = [
+    "матрица",
+    "ёлки",
+    "брат",
+    "звёздные",
+    "войны",
+    "властелин",
+    "колец",
+    "гарри",
+    "поттер",
+    "интерстеллар",
+    "остров",
+    "проклятых",
+    "зелёная",
+    "миля",
+    "побег",
+    "из",
+    "шоушенка",
+    "начало",
+    "король",
+    "лев",
+]
+TYPES = ["FILM", "FILM", "FILM", "TV_SERIES", "MINI_SERIES", "TV_SHOW", "VIDEO"]
+
+
+def title(rng: random.Random) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(1, 4))).capitalize()
+
+
+def description(rng: random.Random) -> str | None:
+    if rng.random() < 0.1:
+        return None
+    return " ".join(rng.choices(WORDS, k=rng.randint(5, 150))).capitalize() + "."
+
+
+def search_film(rng: random.Random, film_id: int) -> Dict[str, Any]:
+    has_poster = rng.random() < 0.9
+    has_rating = rng.random() < 0.8
+    return {
+        "filmId": film_id,
+        "nameRu": title(rng),
+        "nameEn": title(rng) if rng.random() < 0.5 else None,
+        "type": rng.choice(TYPES),
+        "year": str(rng.randint(1920, 2024)) if rng.random() < 0.95 else "null",
+        "description": description(rng),
+        "filmLength": f"{rng.randint(0, 3):02}:{rng.randint(0, 59):02}",
+        "countries": [{"country": c} for c in rng.sample(COUNTRIES, rng.randint(1, 3))],
+        "genres": [{"genre": g} for g in rng.sample(GENRES, rng.randint(0, 4))],
+        "rating": f"{rng.uniform(1, 10):.1f}" if has_rating else "null",
+        "ratingVoteCount": rng.randint(1, 1000000) if has_rating else 0,
+        "posterUrl": f"https://posters.example/{film_id}.jpg" if has_poster else None,
+        "posterUrlPreview": (
+            f"https://posters.example/{film_id}_small.jpg" if has_poster else None
+        ),
+    }
+
+
+def film(rng: random.Random, film_id: int) -> Dict[str, Any]:
+    """
+    Film details in the `/api/v2.2/films/{id}` format
+    """
+    search = search_film(rng, film_id)
+    rating = float(search["rating"]) if search["rating"] != "null" else None
+    year = int(search["year"]) if search["year"] != "null" else None
+    return {
+        "kinopoiskId": film_id,
+        "kinopoiskHDId": None,
+        "imdbId": f"tt{film_id:07}",
+        "nameRu": search["nameRu"],
+        "nameEn": search["nameEn"],
+        "nameOriginal": search["nameEn"],
+        "posterUrl": search["posterUrl"] or "",
+        "posterUrlPreview": search["posterUrlPreview"] or "",
+        "coverUrl": None,
+        "logoUrl": None,
+        "reviewsCount": rng.randint(0, 500),
+        "ratingGoodReview": None,
+        "ratingGoodReviewVoteCount": None,
+        "ratingKinopoisk": rating,
+        "ratingKinopoiskVoteCount": search["ratingVoteCount"] or None,
+        "ratingImdb": None,
+        "ratingImdbVoteCount": None,
+        "ratingFilmCritics": None,
+        "ratingFilmCriticsVoteCount": None,
+        "ratingAwait": None,
+        "ratingAwaitCount": None,
+        "ratingRfCritics": None,
+        "ratingRfCriticsVoteCount": None,
+        "webUrl": f"https://www.kinopoisk.ru/film/{film_id}/",
+        "year": year,
+        "filmLength": rng.randint(5, 200),
+        "slogan": None,
+        "description": search["description"],
+        "shortDescription": None,
+        "editorAnnotation": None,
+        "isTicketsAvailable": False,
+        "productionStatus": None,
+        "type": search["type"],
+        "ratingMpaa": None,
+        "ratingAgeLimits": None,
+        "hasImax": False,
+        "has3D": False,
+        "lastSync": "2024-01-01T00:00:00.000000",
+        "countries": search["countries"],
+        "genres": search["genres"],
+        "startYear": None,
+        "endYear": None,
+        "serial": search["type"] != "FILM",
+        "shortFilm": False,
+        "completed": True,
+    }
+
+
+def search_response(keyword: str, page: int, count: int = 20) -> Dict[str, Any]:
+    """
+    The same response for the same keyword and page
+    """
+    rng = random.Random(f"{keyword}:{page}")
+    return {
+        "keyword": keyword,
+        "pagesCount": 5,
+        "searchFilmsCountResult": 100,
+        "films": [search_film(rng, rng.randrange(1, 5000000)) for _ in range(count)],
+    }
+
+
+def queries(rng: random.Random, count: int, distinct: int = 500) -> List[str]:
+    """
+    Inline queries with a Zipf-like popularity, like real traffic
+    """
+    pool = [title(rng) for _ in range(distinct)]
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    return rng.choices(pool, weights=weights, k=count)
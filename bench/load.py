@@ -0,0 +1,162 @@
+"""
+Replays synthetic inline traffic through the handlers against a local
+stand-in API, at increasing concurrency:
+
+    python -m bench.load --concurrency 1,8,32 --events 2000 --baseline bench/baseline.json
+
+With `--save-baseline` the results are written to the baseline file,
+otherwise the run fails if throughput or p99 latency regress by more than
+`--tolerance` compared to it.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from aiogram.types import ChosenInlineResult, InlineQuery, User
+from kinopoisk_unofficial_api_client import Client
+
+from kpoisk_bot.format import render_cache
+from kpoisk_bot.handlers import chosen_inline_handler, inline_handler
+from kpoisk_bot.session import KinopoiskApi
+
+from . import corpus
+from .standin import FakeBot, StandInApi
+
+# Share of inline queries after which the user picks a result
+CHOSEN_SHARE = 0.2
+
+
+def percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+def make_events(count: int, seed: int) -> List[Tuple[str, str, int]]:
+    rng = random.Random(seed)
+    events = []
+    for query in corpus.queries(rng, count):
+        user = rng.randrange(1000)
+        events.append(("inline", query, user))
+        if rng.random() < CHOSEN_SHARE:
+            events.append(("chosen", query, user))
+    return events
+
+
+async def run_level(
+    api_url: str, events: List[Tuple[str, str, int]], concurrency: int
+) -> Dict[str, Any]:
+    bot = FakeBot()
+    render_cache.clear()
+    async with Client(base_url=api_url) as client:
+        api = KinopoiskApi(client)
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies: List[float] = []
+
+        async def handle(i: int, kind: str, query: str, user_id: int) -> None:
+            user = User(id=user_id, is_bot=False, first_name="User")
+            async with semaphore:
+                started = time.perf_counter()
+                if kind == "inline":
+                    inline_query = InlineQuery(
+                        id=str(i), from_user=user, query=query, offset=""
+                    ).as_(bot)
+                    await inline_handler(inline_query, api)
+                else:
+                    films = api.peek_search(query)
+                    if not films:
+                        return
+                    chosen = ChosenInlineResult(
+                        result_id=str(films[0].film_id),
+                        from_user=user,
+                        query=query,
+                        inline_message_id=str(i),
+                    ).as_(bot)
+                    await chosen_inline_handler(chosen, api)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(handle(i, *event) for i, event in enumerate(events)))
+        elapsed = time.perf_counter() - started
+        await api.close()
+
+    return {
+        "events_per_sec": len(latencies) / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "search_hit_rate": api.search_cache.stats.hit_rate(),
+        "bot_calls": dict(bot.calls),
+    }
+
+
+def regressions(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+) -> List[str]:
+    found = []
+    for level, result in results.items():
+        if level not in baseline:
+            continue
+        expected = baseline[level]
+        if result["events_per_sec"] < expected["events_per_sec"] * (1 - tolerance):
+            found.append(
+                f"concurrency {level}: {result['events_per_sec']:.0f} events/s, "
+                f"baseline {expected['events_per_sec']:.0f}"
+            )
+        if result["p99"] > expected["p99"] * (1 + tolerance):
+            found.append(
+                f"concurrency {level}: p99 {result['p99'] * 1000:.1f}ms, "
+                f"baseline {expected['p99'] * 1000:.1f}ms"
+            )
+    return found
+
+
+async def main(args: argparse.Namespace) -> int:
+    standin = StandInApi(latency=args.latency)
+    runner, api_url = await standin.start()
+    events = make_events(args.events, args.seed)
+    results = {}
+    try:
+        for concurrency in map(int, args.concurrency.split(",")):
+            result = await run_level(api_url, events, concurrency)
+            results[str(concurrency)] = result
+            print(
+                f"concurrency {concurrency:>4}: "
+                f"{result['events_per_sec']:>8.0f} events/s, "
+                f"p50 {result['p50'] * 1000:.2f}ms, "
+                f"p95 {result['p95'] * 1000:.2f}ms, "
+                f"p99 {result['p99'] * 1000:.2f}ms, "
+                f"search hit rate {result['search_hit_rate']:.0%}"
+            )
+    finally:
+        await runner.cleanup()
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(results, indent=2) + "\n")
+        return 0
+    if not baseline_path.exists():
+        return 0
+    found = regressions(results, json.loads(baseline_path.read_text()), args.tolerance)
+    for regression in found:
+        print(f"REGRESSION: {regression}", file=sys.stderr)
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", default="1,8,32,128")
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", default="bench/baseline.json")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,207 @@
+"""
+Replays a traffic log recorded with `KPOISK_CAPTURE_PATH` through the bot
+router against a stand-in API answering with the recorded responses:
+
+    python -m bench.replay traffic.log --speed 10 --output results.json
+
+`--speed 1` keeps the recorded pacing, `--speed 0` feeds all updates at
+once to find the saturation throughput. Requests missing from the log are
+answered from the synthetic corpus.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Tuple
+
+from aiogram import Dispatcher
+from aiogram.types import (
+    Chat,
+    ChosenInlineResult,
+    InlineQuery,
+    Message,
+    Update,
+    User,
+)
+from aiohttp import web
+from kinopoisk_unofficial_api_client import Client
+
+from kpoisk_bot.capture import read_log, request_key
+from kpoisk_bot.format import render_cache
+from kpoisk_bot.handlers import router
+from kpoisk_bot.session import KinopoiskApi
+
+from .load import percentile
+from .standin import FakeBot, StandInApi
+
+
+class RecordedApi(StandInApi):
+    """
+    Stand-in API answering with the recorded responses in their order, the
+    last one is repeated once they run out
+    """
+
+    def __init__(self, responses: Dict[str, Deque[Tuple[int, str]]]) -> None:
+        super().__init__()
+        self.responses = responses
+        self.replayed = 0
+
+    def recorded(self, request: web.Request) -> web.Response | None:
+        queue = self.responses.get(request_key(request.path, dict(request.query)))
+        if not queue:
+            return None
+        status, body = queue.popleft() if len(queue) > 1 else queue[0]
+        self.replayed += 1
+        return web.Response(status=status, text=body, content_type="application/json")
+
+    async def search(self, request: web.Request) -> web.Response:
+        if (response := self.recorded(request)) is not None:
+            self.requests["search"] += 1
+            return response
+        return await super().search(request)
+
+    async def film(self, request: web.Request) -> web.Response:
+        if (response := self.recorded(request)) is not None:
+            self.requests["film"] += 1
+            return response
+        return await super().film(request)
+
+
+def load(
+    path: str,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Deque[Tuple[int, str]]]]:
+    events = []
+    responses: Dict[str, Deque[Tuple[int, str]]] = defaultdict(deque)
+    for record in read_log(path):
+        if record["kind"] == "upstream":
+            responses[record["request"]].append((record["status"], record["body"]))
+        else:
+            events.append(record)
+    return events, responses
+
+
+def make_update(i: int, event: Dict[str, Any]) -> Update:
+    user = User(id=event["user"], is_bot=False, first_name="User")
+    if event["kind"] == "inline":
+        return Update(
+            update_id=i,
+            inline_query=InlineQuery(
+                id=str(i), from_user=user, query=event["query"], offset=event["offset"]
+            ),
+        )
+    if event["kind"] == "chosen":
+        return Update(
+            update_id=i,
+            chosen_inline_result=ChosenInlineResult(
+                result_id=event["result"],
+                from_user=user,
+                query=event["query"],
+                inline_message_id=str(i),
+            ),
+        )
+    return Update(
+        update_id=i,
+        message=Message(
+            message_id=i,
+            date=datetime.fromtimestamp(event["t"], timezone.utc),
+            chat=Chat(id=event["user"], type="private"),
+            from_user=user,
+            text=event["text"],
+        ),
+    )
+
+
+async def replay(
+    api_url: str, events: List[Dict[str, Any]], speed: float, max_gap: float
+) -> Dict[str, Any]:
+    bot = FakeBot()
+    render_cache.clear()
+    dp = Dispatcher()
+    dp.include_router(router)
+    latencies: List[float] = []
+
+    async def handle(i: int, event: Dict[str, Any]) -> None:
+        # Mounted on the bot in advance, feed_update would do it otherwise
+        update = Update.model_validate(
+            make_update(i, event).model_dump(), context={"bot": bot}
+        )
+        started = time.perf_counter()
+        await dp.feed_update(bot, update)
+        latencies.append(time.perf_counter() - started)
+
+    async with Client(base_url=api_url) as client:
+        api = KinopoiskApi(client)
+        dp["api"] = api
+        tasks = []
+        started = time.perf_counter()
+        schedule = 0.0
+        for i, event in enumerate(events):
+            if speed > 0 and i > 0:
+                # Restarts leave long gaps in an appended log, skip them
+                gap = min(max(event["t"] - events[i - 1]["t"], 0), max_gap)
+                schedule += gap / speed
+                delay = started + schedule - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(handle(i, event)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        await api.close()
+
+    return {
+        "updates": len(events),
+        "updates_per_sec": len(events) / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "search_hit_rate": api.search_cache.stats.hit_rate(),
+        "film_hit_rate": api.film_cache.stats.hit_rate(),
+        "stale_served": api.stale_served,
+        "bot_calls": dict(bot.calls),
+    }
+
+
+async def main(args: argparse.Namespace) -> int:
+    events, responses = load(args.log)
+    if not events:
+        print(f"No updates in {args.log}", file=sys.stderr)
+        return 1
+    standin = RecordedApi(responses)
+    runner, api_url = await standin.start()
+    try:
+        result = await replay(api_url, events, args.speed, args.max_gap)
+    finally:
+        await runner.cleanup()
+
+    upstream = sum(standin.requests.values())
+    result["upstream_per_update"] = upstream / len(events)
+    result["upstream_replayed"] = standin.replayed
+    print(
+        f"{result['updates']} updates: "
+        f"{result['updates_per_sec']:.0f} updates/s, "
+        f"p50 {result['p50'] * 1000:.2f}ms, "
+        f"p95 {result['p95'] * 1000:.2f}ms, "
+        f"p99 {result['p99'] * 1000:.2f}ms\n"
+        f"upstream calls per update {result['upstream_per_update']:.3f} "
+        f"({standin.replayed} of {upstream} from the log), "
+        f"search hit rate {result['search_hit_rate']:.0%}, "
+        f"film hit rate {result['film_hit_rate']:.0%}"
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("log")
+    parser.add_argument("--speed", type=float, default=1)
+    parser.add_argument("--max-gap", type=float, default=5)
+    parser.add_argument("--output", default="")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,68 @@
+"""
+Local stand-in for kinopoiskapiunofficial.tech and a Telegram-less bot
+"""
+
+import asyncio
+import random
+from collections import Counter
+from typing import Any, Tuple
+
+from aiogram import Bot
+from aiogram.methods import TelegramMethod
+from aiohttp import web
+
+from . import corpus
+
+
+class FakeBot(Bot):
+    """
+    Bot that records the Bot API methods it is asked to call
+    """
+
+    def __init__(self) -> None:
+        super().__init__("42:BENCHMARK")
+        self.calls: Counter[str] = Counter()
+
+    async def __call__(
+        self, method: TelegramMethod[Any], request_timeout: int | None = None
+    ) -> Any:
+        self.calls[type(method).__name__] += 1
+        return True
+
+
+class StandInApi:
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.requests: Counter[str] = Counter()
+        self.app = web.Application()
+        self.app.router.add_get("/api/v2.1/films/search-by-keyword", self.search)
+        self.app.router.add_get("/api/v2.2/films/{id}", self.film)
+        self.app.router.add_route("HEAD", "/", self.root)
+
+    async def search(self, request: web.Request) -> web.Response:
+        self.requests["search"] += 1
+        await asyncio.sleep(self.latency)
+        return web.json_response(
+            corpus.search_response(
+                request.query.get("keyword", ""), int(request.query.get("page", "1"))
+            )
+        )
+
+    async def film(self, request: web.Request) -> web.Response:
+        self.requests["film"] += 1
+        await asyncio.sleep(self.latency)
+        film_id = int(request.match_info["id"])
+        return web.json_response(corpus.film(random.Random(film_id), film_id))
+
+    async def root(self, request: web.Request) -> web.Response:
+        return web.Response()
+
+    async def start(
+        self, host: str = "127.0.0.1", port: int = 0
+    ) -> Tuple[web.AppRunner, str]:
+        runner = web.AppRunner(self.app)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+        return runner, f"http://{host}:{port}"
@@ -0,0 +1,99 @@
+"""
+Micro-benchmarks, run with pytest-benchmark:
+
+    python -m pytest bench --benchmark-autosave
+    python -m pytest bench --benchmark-compare --benchmark-compare-fail=mean:10%
+"""
+
+import asyncio
+import random
+
+import httpx
+import pytest
+from aiogram.types import InlineQuery, User
+from kinopoisk_unofficial_api_client import Client
+from kinopoisk_unofficial_api_client.models import Film, FilmSearchResponseFilms
+
+from kpoisk_bot.format import FilmFormatter, render_cache, render_inline
+from kpoisk_bot.handlers import inline_handler
+from kpoisk_bot.records import FilmRecord
+from kpoisk_bot.session import KinopoiskApi
+
+from . import corpus
+from .standin import FakeBot
+
+pytest.importorskip("pytest_benchmark")
+
+CORPUS_SIZE = 200
+
+
+@pytest.fixture(scope="module")
+def search_films():
+    rng = random.Random(1)
+    return [
+        FilmRecord.from_search(
+            FilmSearchResponseFilms.from_dict(corpus.search_film(rng, film_id))
+        )
+        for film_id in range(1, CORPUS_SIZE + 1)
+    ]
+
+
+@pytest.fixture(scope="module")
+def films():
+    return [
+        FilmRecord.from_film(
+            Film.from_dict(corpus.film(random.Random(film_id), film_id))
+        )
+        for film_id in range(1, CORPUS_SIZE + 1)
+    ]
+
+
+def test_as_inline(benchmark, search_films):
+    benchmark(lambda: [FilmFormatter(film).as_inline() for film in search_films])
+
+
+def test_as_text_message(benchmark, films):
+    benchmark(lambda: [FilmFormatter(film).as_text_message() for film in films])
+
+
+def test_render_inline_cached(benchmark, search_films):
+    render_cache.clear()
+    benchmark(lambda: [render_inline(film) for film in search_films])
+
+
+def standin_transport(request: httpx.Request) -> httpx.Response:
+    if request.url.path.startswith("/api/v2.2/films/"):
+        film_id = int(request.url.path.rsplit("/", 1)[1])
+        return httpx.Response(200, json=corpus.film(random.Random(film_id), film_id))
+    return httpx.Response(
+        200,
+        json=corpus.search_response(
+            request.url.params["keyword"], int(request.url.params["page"])
+        ),
+    )
+
+
+def test_inline_handler(benchmark):
+    rng = random.Random(1)
+    queries = corpus.queries(rng, 200)
+    user = User(id=1, is_bot=False, first_name="User")
+    bot = FakeBot()
+    loop = asyncio.new_event_loop()
+
+    async def replay() -> None:
+        async with httpx.AsyncClient(
+            base_url="https://example.com",
+            transport=httpx.MockTransport(standin_transport),
+        ) as httpx_client:
+            client = Client(base_url="https://example.com")
+            client.set_async_httpx_client(httpx_client)
+            api = KinopoiskApi(client)
+            for i, query in enumerate(queries):
+                event = InlineQuery(id=str(i), from_user=user, query=query, offset="")
+                await inline_handler(event.as_(bot), api)
+            await api.close()
+
+    try:
+        benchmark(lambda: loop.run_until_complete(replay()))
+    finally:
+        loop.close()
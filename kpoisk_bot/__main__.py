@@ -1,36 +1,319 @@
 import asyncio
 import logging
+import multiprocessing
+import os
+import signal
 import sys
+import time
+from typing import Any, Awaitable, Coroutine, Dict, Tuple
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramAPIError
+from aiohttp import ClientError, web
 
-from .config import TELEGRAM_TOKEN
+from .admission import Admission, AdmissionMiddleware
+from .capture import CaptureMiddleware, TrafficLog
+from .config import (
+    ADMISSION_CAPACITY,
+    ADMISSION_MAX_WAIT,
+    ADMISSION_PER_USER,
+    ADMISSION_QUEUE,
+    API_TOKEN,
+    CAPTURE_PATH,
+    INLINE_ANSWER_WINDOW,
+    INLINE_DEBOUNCE,
+    LOOP_LAG_INTERVAL,
+    METRICS_HOST,
+    METRICS_PORT,
+    PROFILE_DIR,
+    PROFILE_DURATION,
+    PROFILE_INTERVAL,
+    RUN_MODE,
+    SLOW_CALLBACK_THRESHOLD,
+    TELEGRAM_BURST,
+    TELEGRAM_CHAT_BURST,
+    TELEGRAM_CHAT_RATE,
+    TELEGRAM_KEEPALIVE,
+    TELEGRAM_MAX_CONNECTIONS,
+    TELEGRAM_RATE,
+    TELEGRAM_RETRY_ATTEMPTS,
+    TELEGRAM_TOKEN,
+    UVLOOP,
+    WEBHOOK_HOST,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+    WARM_INTERVAL,
+    WARM_PATH,
+    WARM_QUOTA_SHARE,
+    WARM_TOP_K,
+    WORKERS,
+)
+from .debounce import DebounceMiddleware, InlineDebouncer
 from .handlers import router
+from .health import Readiness
+from .metrics import MetricsMiddleware, monitor_loop_lag, start_metrics_server
+from .outbound import OutboundLimiter, TunedAiohttpSession
+from .profiling import LoopWatchdog, Profiler
 from .session import ApiMiddleware
+from .warmer import CacheWarmer
 
 
-async def main() -> None:
+async def timed(name: str, step: Awaitable[Any], timings: Dict[str, float]) -> Any:
+    started = time.perf_counter()
+    try:
+        return await step
+    finally:
+        timings[name] = time.perf_counter() - started
+
+
+async def open_bot_session(bot: Bot) -> None:
+    """
+    Make the first Telegram request in advance, it opens the HTTP session
+    """
+    try:
+        await bot.get_me()
+    except (TelegramAPIError, ClientError) as e:
+        logging.warning(f"Telegram is not reachable yet: {e}")
+
+
+async def setup(worker: int = 0) -> Tuple[Bot, Dispatcher]:
+    for name, value in (
+        ("KPOISK_TELEGRAM_TOKEN", TELEGRAM_TOKEN),
+        ("KPOISK_API_TOKEN", API_TOKEN),
+    ):
+        if not value:
+            sys.exit(f"{name} is not set")
+    if RUN_MODE == "webhook" and not WEBHOOK_URL:
+        sys.exit("KPOISK_WEBHOOK_URL is not set, it is required in webhook mode")
+
+    started = time.perf_counter()
+    dp = Dispatcher()
+    readiness = Readiness()
+    dp["readiness"] = readiness
+    if METRICS_PORT:
+        # Started first, so that the probes are answered while starting up.
+        # Every worker exposes its own metrics on the next port
+        metrics_runner = await start_metrics_server(
+            METRICS_HOST, METRICS_PORT + worker, readiness.routes()
+        )
+        dp.shutdown()(metrics_runner.cleanup)
+
     bot = Bot(
         token=TELEGRAM_TOKEN,
+        session=TunedAiohttpSession(TELEGRAM_MAX_CONNECTIONS, TELEGRAM_KEEPALIVE),
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
+    bot.session.middleware(
+        OutboundLimiter(
+            TELEGRAM_RATE,
+            TELEGRAM_BURST,
+            TELEGRAM_CHAT_RATE,
+            TELEGRAM_CHAT_BURST,
+            TELEGRAM_RETRY_ATTEMPTS,
+        )
+    )
+
+    capture = None
+    if CAPTURE_PATH:
+        # Recorded first, so that shed and dropped updates are replayed too
+        capture = TrafficLog(CAPTURE_PATH)
+        capture_middleware = CaptureMiddleware(capture)
+        router.message.middleware(capture_middleware)
+        router.inline_query.middleware(capture_middleware)
+        router.chosen_inline_result.middleware(capture_middleware)
 
-    session_middleware = ApiMiddleware()
-    await session_middleware.init()
+    metrics_middleware = MetricsMiddleware()
+    router.message.middleware(metrics_middleware)
+    router.inline_query.middleware(metrics_middleware)
+    router.chosen_inline_result.middleware(metrics_middleware)
+
+    session_middleware = ApiMiddleware(capture)
+    timings: Dict[str, float] = {}
+    await asyncio.gather(
+        timed("api", session_middleware.init(), timings),
+        timed("bot", open_bot_session(bot), timings),
+    )
+    # Admitted last, so that debounced queries don't hold a slot while waiting
+    admission_middleware = AdmissionMiddleware(
+        Admission(ADMISSION_CAPACITY, ADMISSION_PER_USER, ADMISSION_QUEUE),
+        INLINE_ANSWER_WINDOW,
+        ADMISSION_MAX_WAIT,
+    )
     router.message.middleware(session_middleware)
+    router.message.middleware(admission_middleware)
     router.inline_query.middleware(session_middleware)
+    router.inline_query.middleware(DebounceMiddleware(InlineDebouncer(INLINE_DEBOUNCE)))
+    router.inline_query.middleware(admission_middleware)
     router.chosen_inline_result.middleware(session_middleware)
+    router.chosen_inline_result.middleware(admission_middleware)
 
-    dp = Dispatcher()
     dp.include_router(router)
+
+    warmer = None
+    if WARM_PATH:
+        # Only the first worker writes the file, the others see the same traffic
+        warmer = CacheWarmer(
+            session_middleware.api,
+            WARM_PATH,
+            WARM_TOP_K,
+            WARM_INTERVAL,
+            WARM_QUOTA_SHARE,
+            persist=worker == 0,
+        )
+        warming = asyncio.create_task(warmer.run())
+
+        @dp.shutdown()
+        async def stop_warmer() -> None:
+            warming.cancel()
+            warmer.save()
+
     dp.shutdown()(session_middleware.on_shutdown)
+    if capture is not None:
+        dp.shutdown()(capture.close)
+
+    lag_monitor = asyncio.create_task(monitor_loop_lag(LOOP_LAG_INTERVAL))
+
+    @dp.shutdown()
+    async def stop_lag_monitor() -> None:
+        lag_monitor.cancel()
+
+    if SLOW_CALLBACK_THRESHOLD > 0:
+        watchdog = asyncio.create_task(
+            LoopWatchdog(SLOW_CALLBACK_THRESHOLD).heartbeat()
+        )
+
+        @dp.shutdown()
+        async def stop_watchdog() -> None:
+            watchdog.cancel()
+
+    # Every worker writes its own files
+    profiler = Profiler(
+        os.path.join(PROFILE_DIR, f"worker-{worker}"),
+        PROFILE_DURATION,
+        PROFILE_INTERVAL,
+    )
+    dp["profiler"] = profiler
+    asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, profiler.trigger)
+
+    async def become_ready() -> None:
+        if warmer is not None:
+            await warmer.first_pass.wait()
+        readiness.set_ready()
+        logging.info(f"Ready in {time.perf_counter() - started:.2f}s")
+
+    readying = asyncio.create_task(become_ready())
+
+    @dp.shutdown()
+    async def stop_readying() -> None:
+        readying.cancel()
+
+    logging.info(
+        f"Started in {time.perf_counter() - started:.2f}s ("
+        + ", ".join(f"{name} {spent:.2f}s" for name, spent in timings.items())
+        + ")"
+    )
+    return bot, dp
+
+
+async def main() -> None:
+    bot, dp = await setup()
 
     # And the run events dispatching
     await dp.start_polling(bot)
 
 
+async def webhook_main(worker: int = 0) -> None:
+    from aiogram.webhook.aiohttp_server import (
+        SimpleRequestHandler,
+        setup_application,
+    )
+
+    bot, dp = await setup(worker)
+
+    app = web.Application()
+    app.add_routes(dp["readiness"].routes())
+    SimpleRequestHandler(
+        dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET or None
+    ).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+
+    if worker == 0:
+        await bot.set_webhook(
+            WEBHOOK_URL + WEBHOOK_PATH, secret_token=WEBHOOK_SECRET or None
+        )
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    # With several workers the kernel balances connections between them
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT, reuse_port=WORKERS > 1)
+    await site.start()
+    logging.info(f"Worker {worker} listening on {WEBHOOK_HOST}:{WEBHOOK_PORT}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    # Runs the dispatcher shutdown hooks and closes the bot session
+    await runner.cleanup()
+
+
+def run(coro: Coroutine[Any, Any, None]) -> None:
+    if not UVLOOP:
+        asyncio.run(coro)
+        return
+    try:
+        import uvloop
+    except ImportError:
+        logging.warning("uvloop is not installed, using the default event loop")
+        asyncio.run(coro)
+        return
+    with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+        runner.run(coro)
+
+
+def run_worker(worker: int) -> None:
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+    run(webhook_main(worker))
+
+
+def run_workers() -> None:
+    workers = [
+        multiprocessing.Process(
+            target=run_worker, args=(worker,), name=f"worker-{worker}"
+        )
+        for worker in range(WORKERS)
+    ]
+    for process in workers:
+        process.start()
+
+    def terminate(*args: object) -> None:
+        for process in workers:
+            process.terminate()
+
+    def profile(*args: object) -> None:
+        for process in workers:
+            if process.pid is not None:
+                os.kill(process.pid, signal.SIGUSR1)
+
+    signal.signal(signal.SIGTERM, terminate)
+    signal.signal(signal.SIGUSR1, profile)
+    # Workers receive SIGINT from the terminal themselves
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for process in workers:
+        process.join()
+
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, stream=sys.stdout)
-    asyncio.run(main())
+    if RUN_MODE == "webhook" and WORKERS > 1:
+        run_workers()
+    elif RUN_MODE == "webhook":
+        run(webhook_main())
+    else:
+        run(main())
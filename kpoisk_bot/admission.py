@@ -0,0 +1,183 @@
+import asyncio
+import heapq
+import itertools
+from collections import Counter
+from enum import Enum, IntEnum
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import ChosenInlineResult, InlineQuery, Message, TelegramObject
+
+from .metrics import CallbackMetric
+
+
+class UpdatePriority(IntEnum):
+    # The user already picked a result and waits for its details
+    CHOSEN = 0
+    # The user is typing, Telegram only waits a few seconds for the answer
+    INLINE = 1
+    # Direct messages can be answered a bit later
+    MESSAGE = 2
+
+
+PRIORITIES = {
+    ChosenInlineResult: UpdatePriority.CHOSEN,
+    InlineQuery: UpdatePriority.INLINE,
+    Message: UpdatePriority.MESSAGE,
+}
+
+
+class Admit(str, Enum):
+    ADMITTED = "admitted"
+    # The user already has as many updates handled or waiting as allowed
+    USER_LIMIT = "user_limit"
+    # Too many updates are already waiting
+    QUEUE_FULL = "queue_full"
+    # No slot was freed within the allowed wait
+    TIMEOUT = "timeout"
+
+
+class Admission:
+    """
+    Bounds the number of updates handled at once, globally and per user,
+    the rest wait for a free slot in priority order
+    """
+
+    def __init__(self, capacity: int, per_user: int, queue_size: int) -> None:
+        self.capacity = capacity
+        self.per_user = per_user
+        self.queue_size = queue_size
+        self.in_flight = 0
+        # Updates of every user either handled or waiting
+        self.users: Counter[int] = Counter()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(
+        self, user_id: int, priority: UpdatePriority, max_wait: float | None = None
+    ) -> Admit:
+        if self.per_user > 0 and self.users[user_id] >= self.per_user:
+            return Admit.USER_LIMIT
+        if self.in_flight < self.capacity and not self._waiters:
+            self.in_flight += 1
+            self.users[user_id] += 1
+            return Admit.ADMITTED
+        if len(self._waiters) >= self.queue_size:
+            return Admit.QUEUE_FULL
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._counter), future)
+        heapq.heappush(self._waiters, entry)
+        self.users[user_id] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), max_wait)
+            return Admit.ADMITTED
+        except asyncio.TimeoutError:
+            self._abandon(user_id, entry)
+            return Admit.TIMEOUT
+        except asyncio.CancelledError:
+            self._abandon(user_id, entry)
+            raise
+
+    def _abandon(self, user_id: int, entry: Tuple[int, int, asyncio.Future]) -> None:
+        future = entry[2]
+        if future.done() and not future.cancelled():
+            # The slot was handed over right at the deadline, pass it on
+            self.release(user_id)
+            return
+        future.cancel()
+        self._waiters.remove(entry)
+        heapq.heapify(self._waiters)
+        self._forget(user_id)
+
+    def _forget(self, user_id: int) -> None:
+        self.users[user_id] -= 1
+        if self.users[user_id] <= 0:
+            del self.users[user_id]
+
+    def release(self, user_id: int) -> None:
+        self._forget(user_id)
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # The slot goes straight to the waiter, in_flight stays
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class AdmissionMiddleware(BaseMiddleware):
+    """
+    Handles an update only once admitted. Inline queries that waited longer
+    than Telegram accepts their answer are dropped, other refused updates
+    are handled with `shed` set, so that they are answered from the cache
+    """
+
+    def __init__(
+        self, admission: Admission, inline_window: float, max_wait: float
+    ) -> None:
+        self.admission = admission
+        self.inline_window = inline_window
+        self.max_wait = max_wait
+        self.shed: Counter[Tuple[str, str]] = Counter()
+        self.dropped = 0
+        CallbackMetric(
+            "kpoisk_admission_in_flight",
+            "Updates admitted and being handled",
+            "gauge",
+            lambda: [({}, admission.in_flight)],
+        )
+        CallbackMetric(
+            "kpoisk_admission_queued",
+            "Updates waiting for admission",
+            "gauge",
+            lambda: [({}, admission.queued())],
+        )
+        CallbackMetric(
+            "kpoisk_admission_shed_total",
+            "Updates answered without doing the work, by update and reason",
+            "counter",
+            lambda: (
+                ({"update": update, "reason": reason}, count)
+                for (update, reason), count in self.shed.items()
+            ),
+        )
+        CallbackMetric(
+            "kpoisk_admission_dropped_total",
+            "Inline queries dropped after waiting past the answer window",
+            "counter",
+            lambda: [({}, self.dropped)],
+        )
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        priority = PRIORITIES.get(type(event))
+        user = getattr(event, "from_user", None)
+        if priority is None or user is None:
+            return await handler(event, data)
+
+        # Inline queries carry no date, their age is counted from arrival
+        inline = isinstance(event, InlineQuery)
+        admitted = await self.admission.acquire(
+            user.id, priority, self.inline_window if inline else self.max_wait
+        )
+        if admitted is not Admit.ADMITTED:
+            if inline and admitted is Admit.TIMEOUT:
+                # Telegram doesn't accept the answer anymore
+                self.dropped += 1
+                return None
+            self.shed[(type(event).__name__, admitted.value)] += 1
+            data["shed"] = True
+            return await handler(event, data)
+
+        try:
+            return await handler(event, data)
+        finally:
+            self.admission.release(user.id)
@@ -0,0 +1,76 @@
+from collections import Counter
+from enum import Enum
+from typing import Any, List, Sequence
+
+from aiogram.types import InlineQuery, InlineQueryResult
+
+from .config import EMPTY_CACHE_TIME, INLINE_CACHE_TIME, PARTIAL_CACHE_TIME
+from .metrics import CallbackMetric
+
+
+class AnswerKind(str, Enum):
+    # Search results, stable for a given query
+    RESULTS = "results"
+    # Results from the cache for a superseded query, possibly incomplete
+    PARTIAL = "partial"
+    # Prompt for an empty query
+    EMPTY = "empty"
+    # Something went wrong, must not be cached by Telegram
+    ERROR = "error"
+
+
+CACHE_TIME = {
+    AnswerKind.RESULTS: INLINE_CACHE_TIME,
+    AnswerKind.PARTIAL: PARTIAL_CACHE_TIME,
+    AnswerKind.EMPTY: EMPTY_CACHE_TIME,
+    AnswerKind.ERROR: 0,
+}
+
+
+class AnswerStats:
+    def __init__(self) -> None:
+        self.answers: Counter[AnswerKind] = Counter()
+        self.duplicates = 0
+
+
+answer_stats = AnswerStats()
+CallbackMetric(
+    "kpoisk_inline_answers_total",
+    "Inline answers by kind and the cache_time given to Telegram",
+    "counter",
+    lambda: (
+        ({"kind": kind.value, "cache_time": CACHE_TIME[kind]}, count)
+        for kind, count in answer_stats.answers.items()
+    ),
+)
+
+
+def deduplicate(results: Sequence[InlineQueryResult]) -> List[InlineQueryResult]:
+    """
+    Drop results with repeating ids, Telegram rejects the whole answer otherwise
+    """
+    seen = set()
+    unique = []
+    for result in results:
+        if result.id not in seen:
+            seen.add(result.id)
+            unique.append(result)
+    return unique
+
+
+async def answer_inline(
+    query: InlineQuery,
+    results: Sequence[InlineQueryResult],
+    kind: AnswerKind,
+    next_offset: str | None = None,
+) -> Any:
+    unique = deduplicate(results)
+    answer_stats.answers[kind] += 1
+    answer_stats.duplicates += len(results) - len(unique)
+    return await query.answer(
+        unique,
+        cache_time=CACHE_TIME[kind],
+        # Answers depend only on the query, so Telegram may share them
+        is_personal=False,
+        next_offset=next_offset,
+    )
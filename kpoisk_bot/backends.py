@@ -0,0 +1,154 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Tuple
+
+from .cache import TTLCache
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+def dumps(data: Dict[str, Any]) -> bytes:
+    """
+    Serialize `to_dict()` of an API model, with msgpack when it is available
+    """
+    if msgpack is not None:
+        return b"m" + msgpack.packb(data)
+    return b"j" + json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def loads(raw: bytes | memoryview) -> Dict[str, Any]:
+    if raw[:1] == b"m":
+        if msgpack is None:
+            raise ValueError("msgpack is required to read this cache entry")
+        return msgpack.unpackb(raw[1:])
+    return json.loads(bytes(raw[1:]))
+
+
+class CacheBackend(ABC):
+    """
+    Byte storage with per-entry TTL, possibly shared between replicas
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+    async def open(self) -> None:
+        """
+        Connect in advance instead of on the first request
+        """
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    def __init__(self, maxsize: int = 10000) -> None:
+        self.cache: TTLCache[str, Tuple[bytes, float]] = TTLCache(maxsize)
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self.cache.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.cache.set(key, (value, time.monotonic() + ttl))
+
+
+class RedisBackend(CacheBackend):
+    def __init__(self, url: str, prefix: str = "kpoisk:") -> None:
+        from redis.asyncio import Redis
+
+        self.redis = Redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.redis.get(self.prefix + key)
+
+    async def open(self) -> None:
+        await self.redis.ping()
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        if ttl <= 0:
+            await self.redis.delete(self.prefix + key)
+            return
+        await self.redis.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+
+class SqliteBackend(CacheBackend):
+    """
+    Queries run in a worker thread. Waiting for a file locked by another
+    worker is cut short after `timeout` seconds, the caller then treats the
+    failed read as a miss.
+    """
+
+    # Expired rows are purged once in this many writes
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str, timeout: float = 0.5) -> None:
+        self.db = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS cache "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)"
+        )
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> bytes | None:
+        with self._lock:
+            row = self.db.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def _set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO cache(key, value, expires) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+            self.writes += 1
+            if self.writes % self.PURGE_EVERY == 0:
+                self.db.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+
+    async def get(self, key: str) -> bytes | None:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def close(self) -> None:
+        with self._lock:
+            self.db.close()
+
+
+def create_backend(url: str) -> CacheBackend | None:
+    """
+    Create a backend from `memory://`, `redis://host:port/db` or
+    `sqlite:///path/to/file` URL, an empty URL disables the shared cache
+    """
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    if url.startswith("sqlite://"):
+        return SqliteBackend(url.removeprefix("sqlite://"))
+    raise ValueError(f"Unknown cache backend: {url}")
@@ -0,0 +1,91 @@
+import hashlib
+import math
+import time
+from typing import Callable, Iterator
+
+
+class BloomFilter:
+    """
+    Set membership in a fixed bit array: no false negatives, false positives
+    at about `error_rate` once `capacity` items are added
+    """
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterator[int]:
+        # Double hashing: k positions from the two halves of a single digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class EmptyPrefixes:
+    """
+    Normalized queries known to find nothing. A query extending one of them
+    finds nothing either, so it is answered without going upstream. The
+    query itself is left to the negative cache, which forgets it sooner.
+    Prefixes shorter than `min_length` are ignored, so that a false positive
+    on a short one doesn't blank a whole range of queries. Two generations
+    of filters are kept and the older one is dropped every `ttl` seconds, so
+    that every entry is forgotten in at most twice that.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float,
+        ttl: float,
+        min_length: int = 3,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.capacity = capacity
+        self.min_length = min_length
+        self.error_rate = error_rate
+        self.ttl = ttl
+        self.timer = timer
+        self.current = BloomFilter(capacity, error_rate)
+        self.previous: BloomFilter | None = None
+        self.rotated_at = timer()
+        self.hits = 0
+
+    def _rotate(self) -> None:
+        now = self.timer()
+        # A full filter is rotated early to keep the false positive rate
+        if now - self.rotated_at >= self.ttl or self.current.count >= self.capacity:
+            self.previous = self.current
+            self.current = BloomFilter(self.capacity, self.error_rate)
+            self.rotated_at = now
+
+    def add(self, query: str) -> None:
+        self._rotate()
+        self.current.add(query)
+
+    def covers(self, query: str) -> bool:
+        self._rotate()
+        # Strict prefixes only
+        for end in range(self.min_length, len(query)):
+            prefix = query[:end]
+            if prefix in self.current or (
+                self.previous is not None and prefix in self.previous
+            ):
+                self.hits += 1
+                return True
+        return False
@@ -0,0 +1,70 @@
+import time
+from typing import Callable
+
+from httpx import HTTPError
+
+
+class CircuitOpen(HTTPError):
+    """
+    The upstream call was not made because the upstream keeps failing
+    """
+
+
+class CircuitBreaker:
+    """
+    Stops calls after `threshold` consecutive failures for `reset_timeout`
+    seconds, then lets a single trial call through: its success closes the
+    circuit again, its failure reopens it. A trial that never reports back
+    is replaced by another one after `reset_timeout`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        threshold: int,
+        reset_timeout: float,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.timer = timer
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trial_at: float | None = None
+        self.rejected = 0
+
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.timer() - self.opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self) -> bool:
+        state = self.state()
+        if state == self.CLOSED:
+            return True
+        now = self.timer()
+        if state == self.HALF_OPEN and (
+            self.trial_at is None or now - self.trial_at >= self.reset_timeout
+        ):
+            self.trial_at = now
+            return True
+        self.rejected += 1
+        return False
+
+    def success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial_at = None
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self.trial_at is not None or (
+            self.threshold > 0 and self.failures >= self.threshold
+        ):
+            self.opened_at = self.timer()
+            self.trial_at = None
@@ -0,0 +1,117 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Iterator, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Fold case, `ё` and whitespace so that equivalent queries share a cache entry
+    """
+    return " ".join(query.casefold().replace("ё", "е").split())
+
+
+class CacheStats:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Bounded LRU cache with an optional time-to-live for every entry
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float | None = None,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.stats = CacheStats()
+        self._data: OrderedDict[K, Tuple[V, float | None]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and (entry[1] is None or entry[1] > self.timer())
+
+    def peek(self, key: K) -> V | None:
+        """
+        Look up a fresh entry without touching LRU order or statistics
+        """
+        return self._data[key][0] if key in self else None
+
+    def get(self, key: K) -> V | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= self.timer():
+            # Expired entries are kept for `get_stale` until they are evicted
+            self.stats.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def get_stale(self, key: K, max_staleness: float | None = None) -> V | None:
+        """
+        Look up an entry even if it has already expired, but not longer than
+        `max_staleness` seconds ago
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if (
+            max_staleness is not None
+            and expires_at is not None
+            and expires_at + max_staleness <= self.timer()
+        ):
+            del self._data[key]
+            return None
+        return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """
+        Store `value` for `ttl` seconds, the cache TTL by default
+        """
+        if self.maxsize <= 0:
+            return
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = self.timer() + ttl if ttl is not None else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.stats.evictions += 1
+
+    def entries(self) -> Iterator[Tuple[K, V, float | None]]:
+        """
+        All entries from the least recently used one, with the seconds left
+        until they expire, negative for expired ones
+        """
+        now = self.timer()
+        for key, (value, expires_at) in list(self._data.items()):
+            yield key, value, expires_at - now if expires_at is not None else None
+
+    def pop(self, key: K) -> V | None:
+        entry = self._data.pop(key, None)
+        return entry[0] if entry is not None else None
+
+    def clear(self) -> None:
+        self._data.clear()
@@ -0,0 +1,145 @@
+"""
+Opt-in recording of the incoming traffic and the upstream responses, to be
+replayed offline with `python -m bench.replay`
+"""
+
+import hashlib
+import logging
+import os
+import struct
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator
+from urllib.parse import urlencode
+
+import httpx
+from aiogram import BaseMiddleware
+from aiogram.types import ChosenInlineResult, InlineQuery, Message, TelegramObject
+
+from .backends import dumps, loads
+from .metrics import CallbackMetric
+
+# Every record is prefixed with its length
+HEADER = struct.Struct("<I")
+
+
+def request_key(path: str, params: Dict[str, str]) -> str:
+    """
+    Key of an upstream request independent of the order and encoding of its
+    parameters
+    """
+    return f"{path}?{urlencode(sorted(params.items()))}"
+
+
+def read_log(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Records of a traffic log, a record cut short by a crash ends it
+    """
+    with open(path, "rb") as f:
+        while len(header := f.read(HEADER.size)) == HEADER.size:
+            (size,) = HEADER.unpack(header)
+            raw = f.read(size)
+            if len(raw) < size:
+                break
+            yield loads(raw)
+
+
+class TrafficLog:
+    """
+    Append-only log of updates and upstream responses: the text of inline
+    queries and of direct messages, chosen result ids and the upstream
+    response bodies are written to disk as is. User ids are replaced by a
+    keyed hash with a salt that is never written, so they stay consistent
+    within a run but can't be traced back. Chat ids, names and other
+    message fields are not recorded.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # Unbuffered, so that every record is a single append even with
+        # several workers writing the same file
+        self.file = open(path, "ab", buffering=0)
+        self.salt = os.urandom(16)
+        self.records = 0
+        CallbackMetric(
+            "kpoisk_capture_records_total",
+            "Records written to the traffic log",
+            "counter",
+            lambda: [({}, self.records)],
+        )
+
+    def user(self, user_id: int) -> int:
+        digest = hashlib.blake2b(
+            str(user_id).encode(), key=self.salt, digest_size=6
+        ).digest()
+        return int.from_bytes(digest, "little")
+
+    def append(self, record: Dict[str, Any]) -> None:
+        record["t"] = round(time.time(), 3)
+        raw = dumps(record)
+        try:
+            self.file.write(HEADER.pack(len(raw)) + raw)
+        except OSError as e:
+            logging.warning(f"Writing to the traffic log {self.path} failed: {e}")
+            return
+        self.records += 1
+
+    def record_update(self, event: TelegramObject) -> None:
+        if isinstance(event, InlineQuery):
+            self.append(
+                {
+                    "kind": "inline",
+                    "user": self.user(event.from_user.id),
+                    "query": event.query,
+                    "offset": event.offset,
+                }
+            )
+        elif isinstance(event, ChosenInlineResult):
+            self.append(
+                {
+                    "kind": "chosen",
+                    "user": self.user(event.from_user.id),
+                    "result": event.result_id,
+                    "query": event.query,
+                }
+            )
+        elif isinstance(event, Message) and event.text and event.from_user:
+            self.append(
+                {
+                    "kind": "message",
+                    "user": self.user(event.from_user.id),
+                    "text": event.text,
+                }
+            )
+
+    def event_hooks(self) -> Dict[str, list]:
+        async def on_response(response: httpx.Response) -> None:
+            await response.aread()
+            self.append(
+                {
+                    "kind": "upstream",
+                    "request": request_key(
+                        response.request.url.path, dict(response.request.url.params)
+                    ),
+                    "status": response.status_code,
+                    "body": response.text,
+                }
+            )
+
+        return {"response": [on_response]}
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class CaptureMiddleware(BaseMiddleware):
+    def __init__(self, log: TrafficLog) -> None:
+        self.log = log
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        self.log.record_update(event)
+        return await handler(event, data)
@@ -1,7 +1,9 @@
 from os import environ
+from typing import List
 
-TELEGRAM_TOKEN: str = environ["KPOISK_TELEGRAM_TOKEN"]
-API_TOKEN: str = environ["KPOISK_API_TOKEN"]
+# Checked on startup, so that the package can be imported without them
+TELEGRAM_TOKEN: str = environ.get("KPOISK_TELEGRAM_TOKEN", default="")
+API_TOKEN: str = environ.get("KPOISK_API_TOKEN", default="")
 API_URL: str = environ.get(
     "KPOISK_API_URL", default="https://kinopoiskapiunofficial.tech"
 )
@@ -10,3 +12,116 @@ KINOPOISK_ROOT: str = environ.get(
 )
 DESCRIPTION_LENGTH: int = int(environ.get("KPOISK_DESCRIPTION_LENGTH", default="500"))
 TOP_RESULTS_COUNT: int = int(environ.get("KPOISK_TOP_RESULTS_COUNT", default="5"))
+SEARCH_CACHE_SIZE: int = int(environ.get("KPOISK_SEARCH_CACHE_SIZE", default="10000"))
+SEARCH_CACHE_TTL: float = float(environ.get("KPOISK_SEARCH_CACHE_TTL", default="3600"))
+FILM_CACHE_SIZE: int = int(environ.get("KPOISK_FILM_CACHE_SIZE", default="10000"))
+FILM_CACHE_TTL: float = float(environ.get("KPOISK_FILM_CACHE_TTL", default="86400"))
+STALE_TTL: float = float(environ.get("KPOISK_STALE_TTL", default="86400"))
+BREAKER_THRESHOLD: int = int(environ.get("KPOISK_BREAKER_THRESHOLD", default="5"))
+BREAKER_RESET: float = float(environ.get("KPOISK_BREAKER_RESET", default="30"))
+API_DAILY_QUOTA: int = int(environ.get("KPOISK_API_DAILY_QUOTA", default="500"))
+PREFETCH_COUNT: int = int(environ.get("KPOISK_PREFETCH_COUNT", default="3"))
+PREFETCH_CONCURRENCY: int = int(environ.get("KPOISK_PREFETCH_CONCURRENCY", default="2"))
+PREFETCH_QUOTA_RESERVE: float = float(
+    environ.get("KPOISK_PREFETCH_QUOTA_RESERVE", default="0.2")
+)
+INLINE_DEBOUNCE: float = float(environ.get("KPOISK_INLINE_DEBOUNCE", default="0.3"))
+INDEX_PATH: str = environ.get("KPOISK_INDEX_PATH", default="")
+INDEX_CACHE_KB: int = int(environ.get("KPOISK_INDEX_CACHE_KB", default="16384"))
+RENDER_CACHE_SIZE: int = int(environ.get("KPOISK_RENDER_CACHE_SIZE", default="5000"))
+RUN_MODE: str = environ.get("KPOISK_RUN_MODE", default="polling")
+WEBHOOK_URL: str = environ.get("KPOISK_WEBHOOK_URL", default="")
+WEBHOOK_PATH: str = environ.get("KPOISK_WEBHOOK_PATH", default="/webhook")
+WEBHOOK_SECRET: str = environ.get("KPOISK_WEBHOOK_SECRET", default="")
+WEBHOOK_HOST: str = environ.get("KPOISK_WEBHOOK_HOST", default="0.0.0.0")
+WEBHOOK_PORT: int = int(environ.get("KPOISK_WEBHOOK_PORT", default="8080"))
+WORKERS: int = int(environ.get("KPOISK_WORKERS", default="1"))
+CACHE_BACKEND: str = environ.get("KPOISK_CACHE_BACKEND", default="")
+SEARCH_RATE: float = float(environ.get("KPOISK_SEARCH_RATE", default="10"))
+SEARCH_BURST: int = int(environ.get("KPOISK_SEARCH_BURST", default="10"))
+FILM_RATE: float = float(environ.get("KPOISK_FILM_RATE", default="10"))
+FILM_BURST: int = int(environ.get("KPOISK_FILM_BURST", default="10"))
+RATE_LIMIT_MAX_WAIT: float = float(
+    environ.get("KPOISK_RATE_LIMIT_MAX_WAIT", default="2")
+)
+HTTP_MAX_CONNECTIONS: int = int(
+    environ.get("KPOISK_HTTP_MAX_CONNECTIONS", default="100")
+)
+HTTP_MAX_KEEPALIVE: int = int(environ.get("KPOISK_HTTP_MAX_KEEPALIVE", default="20"))
+HTTP_KEEPALIVE_EXPIRY: float = float(
+    environ.get("KPOISK_HTTP_KEEPALIVE_EXPIRY", default="60")
+)
+HTTP_CONNECT_TIMEOUT: float = float(
+    environ.get("KPOISK_HTTP_CONNECT_TIMEOUT", default="3")
+)
+HTTP_READ_TIMEOUT: float = float(environ.get("KPOISK_HTTP_READ_TIMEOUT", default="5"))
+HTTP_WRITE_TIMEOUT: float = float(environ.get("KPOISK_HTTP_WRITE_TIMEOUT", default="5"))
+HTTP_POOL_TIMEOUT: float = float(environ.get("KPOISK_HTTP_POOL_TIMEOUT", default="2"))
+HTTP2: bool = environ.get("KPOISK_HTTP2", default="0") == "1"
+FAST_DECODE: bool = environ.get("KPOISK_FAST_DECODE", default="1") == "1"
+HTTP_WARMUP_CONNECTIONS: int = int(
+    environ.get("KPOISK_HTTP_WARMUP_CONNECTIONS", default="2")
+)
+SEARCH_SEND_CONCURRENCY: int = int(
+    environ.get("KPOISK_SEARCH_SEND_CONCURRENCY", default="1")
+)
+SEARCH_COMBINE_THRESHOLD: int = int(
+    environ.get("KPOISK_SEARCH_COMBINE_THRESHOLD", default="0")
+)
+INLINE_CACHE_TIME: int = int(environ.get("KPOISK_INLINE_CACHE_TIME", default="3600"))
+EMPTY_CACHE_TIME: int = int(environ.get("KPOISK_EMPTY_CACHE_TIME", default="60"))
+PARTIAL_CACHE_TIME: int = int(environ.get("KPOISK_PARTIAL_CACHE_TIME", default="0"))
+METRICS_HOST: str = environ.get("KPOISK_METRICS_HOST", default="0.0.0.0")
+METRICS_PORT: int = int(environ.get("KPOISK_METRICS_PORT", default="0"))
+LOOP_LAG_INTERVAL: float = float(environ.get("KPOISK_LOOP_LAG_INTERVAL", default="1"))
+WARM_PATH: str = environ.get("KPOISK_WARM_PATH", default="")
+WARM_TOP_K: int = int(environ.get("KPOISK_WARM_TOP_K", default="100"))
+WARM_INTERVAL: float = float(environ.get("KPOISK_WARM_INTERVAL", default="3600"))
+WARM_QUOTA_SHARE: float = float(environ.get("KPOISK_WARM_QUOTA_SHARE", default="0.1"))
+SNAPSHOT_PATH: str = environ.get("KPOISK_SNAPSHOT_PATH", default="")
+TELEGRAM_RATE: float = float(environ.get("KPOISK_TELEGRAM_RATE", default="30"))
+TELEGRAM_BURST: int = int(environ.get("KPOISK_TELEGRAM_BURST", default="30"))
+TELEGRAM_CHAT_RATE: float = float(environ.get("KPOISK_TELEGRAM_CHAT_RATE", default="1"))
+TELEGRAM_CHAT_BURST: int = int(environ.get("KPOISK_TELEGRAM_CHAT_BURST", default="3"))
+TELEGRAM_RETRY_ATTEMPTS: int = int(
+    environ.get("KPOISK_TELEGRAM_RETRY_ATTEMPTS", default="3")
+)
+TELEGRAM_MAX_CONNECTIONS: int = int(
+    environ.get("KPOISK_TELEGRAM_MAX_CONNECTIONS", default="100")
+)
+TELEGRAM_KEEPALIVE: float = float(
+    environ.get("KPOISK_TELEGRAM_KEEPALIVE", default="60")
+)
+ADMISSION_CAPACITY: int = int(environ.get("KPOISK_ADMISSION_CAPACITY", default="200"))
+ADMISSION_PER_USER: int = int(environ.get("KPOISK_ADMISSION_PER_USER", default="2"))
+ADMISSION_QUEUE: int = int(environ.get("KPOISK_ADMISSION_QUEUE", default="1000"))
+ADMISSION_MAX_WAIT: float = float(environ.get("KPOISK_ADMISSION_MAX_WAIT", default="5"))
+INLINE_ANSWER_WINDOW: float = float(
+    environ.get("KPOISK_INLINE_ANSWER_WINDOW", default="8")
+)
+NEGATIVE_CACHE_TTL: float = float(
+    environ.get("KPOISK_NEGATIVE_CACHE_TTL", default="600")
+)
+EMPTY_FILTER_CAPACITY: int = int(
+    environ.get("KPOISK_EMPTY_FILTER_CAPACITY", default="100000")
+)
+EMPTY_FILTER_ERROR_RATE: float = float(
+    environ.get("KPOISK_EMPTY_FILTER_ERROR_RATE", default="0.0001")
+)
+EMPTY_FILTER_TTL: float = float(environ.get("KPOISK_EMPTY_FILTER_TTL", default="86400"))
+EMPTY_PREFIX_MIN_LENGTH: int = int(
+    environ.get("KPOISK_EMPTY_PREFIX_MIN_LENGTH", default="3")
+)
+UVLOOP: bool = environ.get("KPOISK_UVLOOP", default="0") == "1"
+ADMIN_IDS: List[int] = [
+    int(user_id)
+    for user_id in environ.get("KPOISK_ADMIN_IDS", default="").split(",")
+    if user_id
+]
+PROFILE_DIR: str = environ.get("KPOISK_PROFILE_DIR", default="profiles")
+PROFILE_DURATION: float = float(environ.get("KPOISK_PROFILE_DURATION", default="30"))
+PROFILE_INTERVAL: float = float(environ.get("KPOISK_PROFILE_INTERVAL", default="0.005"))
+SLOW_CALLBACK_THRESHOLD: float = float(
+    environ.get("KPOISK_SLOW_CALLBACK_THRESHOLD", default="0.1")
+)
+CAPTURE_PATH: str = environ.get("KPOISK_CAPTURE_PATH", default="")
@@ -0,0 +1,63 @@
+import asyncio
+import itertools
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import InlineQuery, TelegramObject
+
+from .metrics import CallbackMetric
+
+
+class InlineDebouncer:
+    """
+    Lets only the latest inline query of every user through a quiet window
+    """
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.superseded = 0
+        self._tokens = itertools.count()
+        self._latest: Dict[int, int] = {}
+
+    async def wait(self, user_id: int) -> bool:
+        token = next(self._tokens)
+        self._latest[user_id] = token
+        if self.delay > 0:
+            await asyncio.sleep(self.delay)
+        if self._latest.get(user_id) != token:
+            self.superseded += 1
+            return False
+        del self._latest[user_id]
+        return True
+
+    def skip(self, user_id: int) -> None:
+        """
+        Let a query through at once, still superseding the older ones
+        """
+        self._latest.pop(user_id, None)
+
+
+class DebounceMiddleware(BaseMiddleware):
+    def __init__(self, debouncer: InlineDebouncer) -> None:
+        self.debouncer = debouncer
+        CallbackMetric(
+            "kpoisk_inline_superseded_total",
+            "Inline queries superseded by a newer query of the same user",
+            "counter",
+            lambda: [({}, debouncer.superseded)],
+        )
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if isinstance(event, InlineQuery) and event.query:
+            api = data.get("api")
+            if api is not None and api.is_cached(event.query):
+                # Answered without going upstream, waiting would only add latency
+                self.debouncer.skip(event.from_user.id)
+            else:
+                data["superseded"] = not await self.debouncer.wait(event.from_user.id)
+        return await handler(event, data)
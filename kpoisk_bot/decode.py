@@ -0,0 +1,135 @@
+"""
+Fast path for search responses: films are decoded straight from JSON into
+`FilmRecord`s, one by one when they are first accessed, so an inline answer
+showing a few films doesn't pay for the whole page.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Sequence, overload
+
+from kinopoisk_unofficial_api_client.models import (
+    FilmSearchResponse,
+    FilmSearchResponseFilms,
+)
+
+from .records import FilmRecord, typed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def parse_json(content: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def decode_film(data: Dict[str, Any]) -> FilmRecord:
+    try:
+        return FilmRecord.from_dict(data)
+    except (KeyError, TypeError, ValueError) as e:
+        logging.debug(f"Falling back to the generated model for a film: {e}")
+        return FilmRecord.from_search(FilmSearchResponseFilms.from_dict(data))
+
+
+class LazyFilms(Sequence[FilmRecord]):
+    """
+    List of films in the search response format, decoded on first access
+    """
+
+    __slots__ = ("items",)
+
+    def __init__(self, items: List[Dict[str, Any] | FilmRecord]) -> None:
+        self.items = items
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @overload
+    def __getitem__(self, index: int) -> FilmRecord: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[FilmRecord]: ...
+
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.items)))]
+        film = self.items[index]
+        if isinstance(film, dict):
+            film = self.items[index] = decode_film(film)
+        return film
+
+    def decoded(self) -> int:
+        return sum(isinstance(film, FilmRecord) for film in self.items)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [
+            film.to_dict() if isinstance(film, FilmRecord) else film
+            for film in self.items
+        ]
+
+
+class SearchResult:
+    """
+    Search response with the films as `FilmRecord`s
+    """
+
+    __slots__ = ("keyword", "pages_count", "search_films_count_result", "films")
+
+    def __init__(
+        self,
+        keyword: str | None,
+        pages_count: int | None,
+        search_films_count_result: int | None,
+        films: LazyFilms,
+    ) -> None:
+        self.keyword = keyword
+        self.pages_count = pages_count
+        self.search_films_count_result = search_films_count_result
+        self.films = films
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SearchResult":
+        """
+        Use the generated model if the response doesn't look as expected
+        """
+        try:
+            films = data["films"]
+            if not isinstance(films, list) or not all(
+                isinstance(film, dict) for film in films
+            ):
+                raise TypeError("films is not a list of objects")
+            return cls(
+                typed(data, "keyword", str),
+                typed(data, "pagesCount", int),
+                typed(data, "searchFilmsCountResult", int),
+                LazyFilms(list(films)),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            logging.warning(f"Falling back to the generated model for a search: {e}")
+            return cls.from_model(FilmSearchResponse.from_dict(data))
+
+    @classmethod
+    def from_model(cls, result: FilmSearchResponse) -> "SearchResult":
+        return cls(
+            result.keyword or None,
+            result.pages_count or None,
+            result.search_films_count_result or None,
+            LazyFilms([FilmRecord.from_search(film) for film in result.films or []]),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "keyword": self.keyword,
+            "pagesCount": self.pages_count,
+            "searchFilmsCountResult": self.search_films_count_result,
+            "films": self.films.to_dicts(),
+        }
+        return {key: value for key, value in data.items() if value is not None}
+
+
+def decode_search(content: bytes) -> SearchResult:
+    return SearchResult.from_dict(parse_json(content))
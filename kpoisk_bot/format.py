@@ -1,5 +1,6 @@
 import textwrap
-from typing import Tuple
+import time
+from typing import Any, Tuple
 
 from aiogram.types import (
     InlineKeyboardButton,
@@ -18,21 +19,21 @@ from aiogram.utils.formatting import (
     as_line,
     as_list,
 )
-from kinopoisk_unofficial_api_client.models import Film, FilmSearchResponseFilms
 
-from .config import DESCRIPTION_LENGTH, KINOPOISK_ROOT
+from .cache import TTLCache
+from .config import DESCRIPTION_LENGTH, KINOPOISK_ROOT, RENDER_CACHE_SIZE
+from .metrics import RENDER_LATENCY, CallbackMetric
+from .records import FilmRecord
 
 
 class FilmFormatter:
-    film: FilmSearchResponseFilms | Film
+    film: FilmRecord
 
-    def __init__(self, film: FilmSearchResponseFilms | Film) -> None:
+    def __init__(self, film: FilmRecord) -> None:
         self.film = film
 
-    def get_id(self) -> int:
-        return (
-            self.film.kinopoisk_id if isinstance(self.film, Film) else self.film.film_id
-        )
+    def get_id(self) -> int | None:
+        return self.film.film_id
 
     def is_valid(self) -> bool:
         return bool(self.get_id())
@@ -57,7 +58,7 @@ class FilmFormatter:
             "TV_SHOW": "ТВ-шоу",
             "VIDEO": "видео",
         }
-        return DESCRIPTION[str(self.film.type)]
+        return DESCRIPTION[self.film.type]
 
     def get_description(self) -> str:
         return self.film.description or "Без описания"
@@ -66,32 +67,18 @@ class FilmFormatter:
         return f"{KINOPOISK_ROOT}/film/{self.get_id()}/"
 
     def get_year(self) -> str | None:
-        return (
-            str(self.film.year)
-            if self.film.year and isinstance(self.film, Film)
-            else (self.film.year if self.film.year else None)
-        )
+        return self.film.year or None
 
     def get_rating(self) -> Tuple[str, int] | None:
-        if isinstance(self.film, Film):
-            return (
-                (
-                    str(self.film.rating_kinopoisk),
-                    self.film.rating_kinopoisk_vote_count,
-                )
-                if self.film.rating_kinopoisk and self.film.rating_kinopoisk_vote_count
-                else None
-            )
         return (
             (self.film.rating, self.film.rating_vote_count)
-            if self.film.rating
-            and self.film.rating != "null"
-            and self.film.rating_vote_count
+            if self.film.rating and self.film.rating_vote_count
             else None
         )
 
     def get_title_description(self) -> str:
-        return self.get_type() + ((", " + self.get_year()) if self.get_year() else "")
+        year = self.get_year()
+        return self.get_type() + ((", " + year) if year else "")
 
     def inline_title(self) -> str:
         return f"{self.get_title()} ({self.get_title_description()})"
@@ -99,17 +86,18 @@ class FilmFormatter:
     def inline_description(self) -> str:
         res = ""
         if self.film.genres:
-            res += ", ".join(map(lambda g: g.genre, self.film.genres))
+            res += ", ".join(self.film.genres)
         return res
 
-    def as_inline_content(self) -> InputTextMessageContent:
+    def as_inline_content(self, title: str | None = None) -> InputTextMessageContent:
+        title = title or self.inline_title()
         link_options = None
-        content = Text(self.inline_title())
+        content = Text(title)
         if self.has_poster():
             link_options = LinkPreviewOptions(
                 is_disabled=False, show_above_text=True, force_large_media=True
             )
-            content = TextLink(self.inline_title(), url=self.get_poster())
+            content = TextLink(title, url=self.get_poster())
         return InputTextMessageContent(
             link_preview_options=link_options,
             **content.as_kwargs(text_key="message_text"),
@@ -127,13 +115,20 @@ class FilmFormatter:
             ]
         )
 
+    def fingerprint(self) -> int:
+        """
+        Hash of everything the rendered output depends on
+        """
+        return hash(self.film)
+
     def as_inline(self) -> InlineQueryResult:
+        title = self.inline_title()
         return InlineQueryResultArticle(
             id=str(self.get_id()),
-            title=self.inline_title(),
+            title=title,
             description=self.inline_description(),
             thumbnail_url=self.get_poster_preview(),
-            input_message_content=self.as_inline_content(),
+            input_message_content=self.as_inline_content(title),
             reply_markup=self.create_inline_markup(),
         )
 
@@ -150,7 +145,7 @@ class FilmFormatter:
             return as_line(
                 Bold("Жанры:"),
                 as_line(
-                    *[HashTag(f"#{g.genre}") for g in self.film.genres],
+                    *[HashTag(f"#{genre}") for genre in self.film.genres],
                     end="",
                     sep=", ",
                 ),
@@ -225,3 +220,43 @@ class FilmFormatter:
                 ]
             ]
         )
+
+
+# Rendered payloads keyed by kind, film id and fingerprint. They are shared
+# between answers, so callers must not modify them.
+render_cache: TTLCache[Tuple[str, int, int], Any] = TTLCache(RENDER_CACHE_SIZE)
+CallbackMetric(
+    "kpoisk_render_cache_total",
+    "Render cache lookups by outcome",
+    "counter",
+    lambda: [
+        ({"outcome": "hit"}, render_cache.stats.hits),
+        ({"outcome": "miss"}, render_cache.stats.misses),
+    ],
+)
+
+
+def render_inline(film: FilmRecord) -> InlineQueryResult:
+    formatter = FilmFormatter(film)
+    key = ("inline", formatter.get_id(), formatter.fingerprint())
+    rendered = render_cache.get(key)
+    if rendered is None:
+        started = time.perf_counter()
+        rendered = formatter.as_inline()
+        RENDER_LATENCY.observe(time.perf_counter() - started, kind="inline")
+        render_cache.set(key, rendered)
+    return rendered
+
+
+def render_text_message(
+    film: FilmRecord,
+) -> Tuple[InputTextMessageContent, InlineKeyboardMarkup]:
+    formatter = FilmFormatter(film)
+    key = ("text", formatter.get_id(), formatter.fingerprint())
+    rendered = render_cache.get(key)
+    if rendered is None:
+        started = time.perf_counter()
+        rendered = (formatter.as_text_message(), formatter.create_result_markup())
+        RENDER_LATENCY.observe(time.perf_counter() - started, kind="text")
+        render_cache.set(key, rendered)
+    return rendered
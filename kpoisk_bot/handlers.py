@@ -1,27 +1,52 @@
 import logging
-from typing import Any
+from typing import Any, Awaitable, Callable, List, Set, Tuple
 
-from aiogram import Router, html
-from aiogram.filters import CommandStart
+from aiogram import F, Router, html
+from aiogram.filters import Command, CommandStart
 from aiogram.types import (
     ChosenInlineResult,
+    FSInputFile,
     InlineQuery,
     InlineQueryResultArticle,
     InputTextMessageContent,
     Message,
 )
 from httpx import HTTPError
-from kinopoisk_unofficial_api_client import Client
-from kinopoisk_unofficial_api_client.api.films import (
-    get_api_v2_1_films_search_by_keyword,
-    get_api_v2_2_films_id,
+
+from .answers import AnswerKind, answer_inline
+from .config import (
+    ADMIN_IDS,
+    SEARCH_COMBINE_THRESHOLD,
+    SEARCH_SEND_CONCURRENCY,
+    TOP_RESULTS_COUNT,
 )
+from .format import render_inline, render_text_message
+from .profiling import Profiler
+from .records import FilmRecord
+from .sending import combine_messages, send_all
+from .session import KinopoiskApi
 
-from .config import TOP_RESULTS_COUNT
-from .format import FilmFormatter
+router = Router()
 
+BUSY_TEXT = "Слишком много запросов, попробуйте ещё раз чуть позже"
+ERROR_TEXT = "Что-то пошло не так :("
+# Marks the offsets of pages following a first page from the local index
+LOCAL_OFFSET = "L"
 
-router = Router()
+
+async def search_after(
+    api: KinopoiskApi, keyword: str, offset: int, shown: Set[int]
+) -> Tuple[List[FilmRecord], int | None]:
+    """
+    Slice of the upstream results from `offset` without the `shown` films,
+    along with the offset of the following slice
+    """
+    while True:
+        films, next_offset = await api.search_slice(keyword, offset, TOP_RESULTS_COUNT)
+        films = [film for film in films if film.film_id not in shown]
+        if films or next_offset is None:
+            return films, next_offset
+        offset = next_offset
 
 
 @router.message(CommandStart())
@@ -32,33 +57,64 @@ async def command_start_handler(message: Message) -> None:
     await message.answer(f"Hello, {html.bold(message.from_user.full_name)}!")
 
 
+@router.message(Command("profile"), F.from_user.id.in_(ADMIN_IDS))
+async def profile_handler(message: Message, profiler: Profiler) -> Any:
+    """
+    Capture a profile of the running bot and send it to the admin
+    """
+    await message.reply(f"Profiling for {profiler.duration:g}s")
+    try:
+        paths = await profiler.capture()
+    except (RuntimeError, OSError) as e:
+        return await message.reply(str(e))
+    for path in paths:
+        await message.answer_document(FSInputFile(path))
+
+
 @router.message()
-async def search_handler(message: Message, api_client: Client) -> Any:
+async def search_handler(
+    message: Message, api: KinopoiskApi, shed: bool = False
+) -> Any:
     if message.text is None:
         return
-    try:
-        results = await get_api_v2_1_films_search_by_keyword.asyncio(
-            client=api_client, keyword=message.text, page=1
+    if shed:
+        # Overloaded, answer only what is already cached
+        films = api.peek_search(message.text)
+        if not films:
+            return await message.reply(BUSY_TEXT)
+    else:
+        try:
+            result = await api.search(message.text)
+        except HTTPError as e:
+            logging.error(e)
+            return await message.reply(ERROR_TEXT)
+        films = result.films if result is not None else []
+
+    contents = [render_text_message(film)[0] for film in films[:TOP_RESULTS_COUNT]]
+    if SEARCH_COMBINE_THRESHOLD and len(contents) > SEARCH_COMBINE_THRESHOLD:
+        contents = combine_messages(contents)
+
+    def reply(content: InputTextMessageContent) -> Callable[[], Awaitable[Message]]:
+        return lambda: message.reply(
+            content.message_text,
+            link_preview_options=content.link_preview_options,
+            entities=content.entities,
+            parse_mode=content.parse_mode,
         )
-        for content in map(
-            lambda film: FilmFormatter(film).as_text_message(),
-            results.films[:TOP_RESULTS_COUNT],
-        ):
-            await message.reply(
-                content.message_text,
-                link_preview_options=content.link_preview_options,
-                entities=content.entities,
-                parse_mode=content.parse_mode,
-            )
-    except HTTPError as e:
-        # But not all the types is supported to be copied so need to handle it
-        logging.error(e)
+
+    await send_all([reply(content) for content in contents], SEARCH_SEND_CONCURRENCY)
 
 
 @router.inline_query()
-async def inline_handler(query: InlineQuery, api_client: Client) -> Any:
+async def inline_handler(
+    query: InlineQuery,
+    api: KinopoiskApi,
+    superseded: bool = False,
+    shed: bool = False,
+) -> Any:
     if not query.query:
-        return await query.answer(
+        return await answer_inline(
+            query,
             [
                 InlineQueryResultArticle(
                     id="EMPTY",
@@ -67,51 +123,117 @@ async def inline_handler(query: InlineQuery, api_client: Client) -> Any:
                         message_text="Этот бот поможет вам найти фильм в КиноПоиске"
                     ),
                 )
-            ]
+            ],
+            AnswerKind.EMPTY,
         )
 
+    if superseded or shed:
+        # A newer query from the same user is pending or the bot is
+        # overloaded, don't go upstream
+        films = (
+            api.peek_search(query.query)
+            or await api.local_search(query.query, TOP_RESULTS_COUNT)
+        )[:TOP_RESULTS_COUNT]
+        if shed and not films:
+            return await answer_inline(
+                query,
+                [
+                    InlineQueryResultArticle(
+                        id="BUSY",
+                        title=BUSY_TEXT,
+                        input_message_content=InputTextMessageContent(
+                            message_text=BUSY_TEXT
+                        ),
+                    )
+                ],
+                AnswerKind.ERROR,
+            )
+        return await answer_inline(
+            query, [render_inline(film) for film in films], AnswerKind.PARTIAL
+        )
+
+    # The upstream ranking differs from the local one: scrolling past a first
+    # page from the local index goes through the upstream results from the
+    # start, skipping the films that page showed
+    after_local = query.offset.startswith(LOCAL_OFFSET)
+    raw_offset = query.offset.removeprefix(LOCAL_OFFSET)
+    offset = int(raw_offset) if raw_offset.isdigit() else 0
+    first_page = not offset and not after_local
     try:
-        api_result = await get_api_v2_1_films_search_by_keyword.asyncio(
-            client=api_client, keyword=query.query, page=1
+        if first_page:
+            api.popularity.query(query.query)
+        # Typo matches may rank below films the API knows, they don't count
+        local = (
+            await api.local_search(query.query, TOP_RESULTS_COUNT, fuzzy=False)
+            if first_page or after_local
+            else []
+        )
+        if first_page and len(local) >= TOP_RESULTS_COUNT:
+            films, next_offset = local, f"{LOCAL_OFFSET}0"
+        else:
+            # Not enough films are known locally, ask the API
+            shown = {film.film_id for film in local} if after_local else set()
+            films, upstream_offset = await search_after(api, query.query, offset, shown)
+            next_offset = (
+                f"{LOCAL_OFFSET if after_local else ''}{upstream_offset}"
+                if upstream_offset
+                else None
+            )
+        results = [render_inline(film) for film in films]
+        api.prefetch(film.film_id for film in films)
+        return await answer_inline(
+            query, results, AnswerKind.RESULTS, next_offset=next_offset
         )
-        results = [
-            FilmFormatter(film).as_inline()
-            for film in api_result.films[:TOP_RESULTS_COUNT]
-        ]
-        return await query.answer(results)
     except (HTTPError, TypeError) as e:
         logging.error(e)
-        return await query.answer(
+        films = (
+            await api.local_search(query.query, TOP_RESULTS_COUNT) if first_page else []
+        )
+        if films:
+            # The API is down, the local index is the best answer there is
+            return await answer_inline(
+                query, [render_inline(film) for film in films], AnswerKind.PARTIAL
+            )
+        return await answer_inline(
+            query,
             [
                 InlineQueryResultArticle(
                     id="ERROR",
                     title="Упс, что-то пошло не так",
                     input_message_content=InputTextMessageContent(
-                        message_text="Что-то пошло не так :("
+                        message_text=ERROR_TEXT
                     ),
                 )
-            ]
+            ],
+            AnswerKind.ERROR,
         )
 
 
 @router.chosen_inline_result()
-async def chosen_inline_handler(result: ChosenInlineResult, api_client: Client) -> Any:
-    if result.result_id == "ERROR" or result.result_id == "EMPTY":
+async def chosen_inline_handler(
+    result: ChosenInlineResult, api: KinopoiskApi, shed: bool = False
+) -> Any:
+    if result.result_id in ("ERROR", "EMPTY", "BUSY"):
         return
 
-    film = await get_api_v2_2_films_id.asyncio(
-        id=int(result.result_id), client=api_client
-    )
-    formatter = FilmFormatter(film)
-    as_message = formatter.as_text_message()
+    api.popularity.chosen(int(result.result_id))
+    if shed:
+        # The message keeps the title and the link from the inline result
+        return
+    try:
+        film = await api.get_film(int(result.result_id))
+    except HTTPError as e:
+        # The message keeps the title and the link from the inline result
+        logging.error(e)
+        return
+    if film is None:
+        return
+    as_message, markup = render_text_message(film)
     await result.bot.edit_message_text(
         inline_message_id=result.inline_message_id,
         text=as_message.message_text,
         parse_mode=as_message.parse_mode,
         entities=as_message.entities,
         link_preview_options=as_message.link_preview_options,
-    )
-    await result.bot.edit_message_reply_markup(
-        inline_message_id=result.inline_message_id,
-        reply_markup=formatter.create_result_markup(),
+        reply_markup=markup,
     )
@@ -0,0 +1,30 @@
+from typing import List
+
+from aiohttp import web
+
+
+class Readiness:
+    """
+    Liveness and readiness probes: the process answers `/healthz` as soon as
+    it starts, `/readyz` only once it is initialized and its caches are warm
+    """
+
+    def __init__(self) -> None:
+        self.ready = False
+
+    def set_ready(self) -> None:
+        self.ready = True
+
+    async def health_view(self, request: web.Request) -> web.Response:
+        return web.Response(text="ok")
+
+    async def ready_view(self, request: web.Request) -> web.Response:
+        if not self.ready:
+            return web.Response(status=503, text="starting")
+        return web.Response(text="ready")
+
+    def routes(self) -> List[web.RouteDef]:
+        return [
+            web.get("/healthz", self.health_view),
+            web.get("/readyz", self.ready_view),
+        ]
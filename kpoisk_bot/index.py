@@ -0,0 +1,168 @@
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Set
+
+from .cache import normalize_query
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS films (
+    film_id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    votes INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS titles USING fts5(
+    title, content='films', content_rowid='film_id', tokenize='trigram'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS titles_vocab USING fts5vocab(titles, row);
+CREATE TRIGGER IF NOT EXISTS films_ai AFTER INSERT ON films BEGIN
+    INSERT INTO titles(rowid, title) VALUES (new.film_id, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS films_ad AFTER DELETE ON films BEGIN
+    INSERT INTO titles(titles, rowid, title) VALUES ('delete', old.film_id, old.title);
+END;
+CREATE TRIGGER IF NOT EXISTS films_au AFTER UPDATE ON films BEGIN
+    INSERT INTO titles(titles, rowid, title) VALUES ('delete', old.film_id, old.title);
+    INSERT INTO titles(rowid, title) VALUES (new.film_id, new.title);
+END;
+"""
+
+# Share of the query trigrams a title must contain to count as a typo match
+FUZZY_THRESHOLD = 0.5
+# Titles matching a query are ranked among at most this many, so that the
+# cost of a query doesn't grow with the index
+MAX_CANDIDATES = 1000
+# Trigrams in more titles than this narrow a typo search down too little
+COMMON_TRIGRAM_TITLES = 20000
+
+
+def trigrams(text: str) -> Set[str]:
+    return {"".join(chars) for chars in zip(text, text[1:], text[2:])}
+
+
+def quote(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+class FilmIndex:
+    """
+    Persistent full-text index over every film the bot has seen.
+
+    Films are stored as dicts in the search response format
+    (`FilmRecord.to_dict()`), titles are matched by substring
+    with a trigram tokenizer, so queries shorter than 3 characters never match.
+
+    Both `add` and `search` are meant to be called from worker threads: `add`
+    writes through a connection of its own, so that waiting for the lock of
+    a file shared between workers doesn't hold up searches. A search ranks
+    at most `MAX_CANDIDATES` matching titles and skips typo matching on
+    trigrams found in too many titles, so its cost stays bounded as the
+    index grows.
+    """
+
+    def __init__(self, path: str, cache_kb: int = 16384) -> None:
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        # Negative value is the page cache limit in KiB, keeps RSS bounded
+        self.db.execute(f"PRAGMA cache_size=-{cache_kb}")
+        self.db.executescript(SCHEMA)
+        # An in-memory database exists only within its connection
+        self.writer = (
+            self.db
+            if path == ":memory:"
+            else sqlite3.connect(path, check_same_thread=False)
+        )
+        self._write_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT count(*) FROM films").fetchone()[0]
+
+    def add(self, films: Iterable[Dict[str, Any]]) -> None:
+        rows = [
+            (
+                film["filmId"],
+                normalize_query(
+                    " / ".join(filter(None, (film.get("nameRu"), film.get("nameEn"))))
+                ),
+                film.get("ratingVoteCount") or 0,
+                json.dumps(film, ensure_ascii=False, separators=(",", ":")),
+            )
+            for film in films
+            if film.get("filmId")
+        ]
+        with self._write_lock, self.writer:
+            self.writer.executemany(
+                "INSERT INTO films(film_id, title, votes, data) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(film_id) DO UPDATE SET "
+                "title=excluded.title, votes=excluded.votes, data=excluded.data",
+                rows,
+            )
+
+    def search(
+        self, query: str, limit: int, fuzzy: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Titles containing `query`, then, with `fuzzy`, titles sharing enough
+        of its trigrams to be a typo
+        """
+        normalized = normalize_query(query)
+        if len(normalized) < 3:
+            return []
+        found = self.db.execute(
+            "SELECT film_id, data FROM films WHERE film_id IN "
+            "(SELECT rowid FROM titles WHERE titles MATCH ? LIMIT ?) "
+            "ORDER BY votes DESC LIMIT ?",
+            (quote(normalized), MAX_CANDIDATES, limit),
+        ).fetchall()
+        if fuzzy and len(found) < limit:
+            found += self._fuzzy(normalized, limit - len(found), {i for i, _ in found})
+        return [json.loads(data) for _, data in found]
+
+    def _fuzzy(self, normalized: str, limit: int, exclude: Set[int]) -> List[Any]:
+        query_trigrams = trigrams(normalized)
+        if len(query_trigrams) < 2:
+            # A single trigram is the whole query, the exact search covered it
+            return []
+        placeholders = ", ".join("?" * len(query_trigrams))
+        known = self.db.execute(
+            f"SELECT term, doc FROM titles_vocab WHERE term IN ({placeholders})",
+            tuple(query_trigrams),
+        ).fetchall()
+        if len(known) < FUZZY_THRESHOLD * len(query_trigrams):
+            # No title can share enough trigrams with the query
+            return []
+        rare = [term for term, titles in known if titles <= COMMON_TRIGRAM_TITLES]
+        if not rare:
+            return []
+        candidates = self.db.execute(
+            "SELECT film_id, title, votes FROM films WHERE film_id IN "
+            "(SELECT rowid FROM titles WHERE titles MATCH ? LIMIT ?)",
+            (" OR ".join(map(quote, rare)), MAX_CANDIDATES),
+        ).fetchall()
+        scored = []
+        for film_id, title, votes in candidates:
+            if film_id in exclude:
+                continue
+            # Titles are normalized, a substring check is a trigram lookup
+            score = sum(trigram in title for trigram in query_trigrams)
+            if score >= FUZZY_THRESHOLD * len(query_trigrams):
+                scored.append((score, votes, film_id))
+        scored.sort(reverse=True)
+        best = [film_id for _, _, film_id in scored[:limit]]
+        data = dict(
+            self.db.execute(
+                f"SELECT film_id, data FROM films "
+                f"WHERE film_id IN ({', '.join('?' * len(best))})",
+                best,
+            )
+        )
+        return [(film_id, data[film_id]) for film_id in best]
+
+    def close(self) -> None:
+        # Waits for a write still running in a worker thread
+        with self._write_lock:
+            if self.writer is not self.db:
+                self.writer.close()
+            self.db.close()
@@ -0,0 +1,208 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Sequence, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from aiohttp import web
+
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Labels, float]
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def as_labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_sample(name: str, labels: Labels, value: float) -> str:
+    if not labels:
+        return f"{name} {value}"
+    rendered = ",".join(f'{key}="{escape(value)}"' for key, value in labels)
+    return f"{name}{{{rendered}}} {value}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: Dict[str, "Metric"] = {}
+
+    def register(self, metric: "Metric") -> None:
+        # Re-registering a name replaces the old metric, e.g. a recreated cache
+        self.metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(format_sample(*sample) for sample in metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, registry: Registry = REGISTRY
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        registry.register(self)
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = as_labels(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        return ((self.name, labels, value) for labels, value in self.values.items())
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        self.values[as_labels(labels)] = value
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        registry: Registry = REGISTRY,
+    ) -> None:
+        super().__init__(name, documentation, registry)
+        self.buckets = tuple(buckets)
+        self.values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        counts, total = self.values.setdefault(
+            as_labels(labels), ([0] * (len(self.buckets) + 1), [0.0])
+        )
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        counts[-1] += 1
+        total[0] += value
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, (counts, total) in self.values.items():
+            for bound, count in zip(self.buckets, counts):
+                yield f"{self.name}_bucket", labels + (("le", str(bound)),), count
+            yield f"{self.name}_bucket", labels + (("le", "+Inf"),), counts[-1]
+            yield f"{self.name}_sum", labels, total[0]
+            yield f"{self.name}_count", labels, counts[-1]
+
+
+class CallbackMetric(Metric):
+    """
+    Metric read from existing statistics when it is scraped
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        type: str,
+        callback: Callable[[], Iterable[Tuple[Dict[str, Any], float]]],
+        registry: Registry = REGISTRY,
+    ) -> None:
+        self.type = type
+        self.callback = callback
+        super().__init__(name, documentation, registry)
+
+    def samples(self) -> Iterable[Sample]:
+        return (
+            (self.name, as_labels(labels), value) for labels, value in self.callback()
+        )
+
+
+HANDLER_LATENCY = Histogram(
+    "kpoisk_handler_latency_seconds", "Time spent handling an update"
+)
+HANDLER_IN_FLIGHT = Gauge("kpoisk_handler_in_flight", "Updates being handled")
+HANDLER_ERRORS = Counter("kpoisk_handler_errors_total", "Handlers that raised")
+UPSTREAM_LATENCY = Histogram(
+    "kpoisk_upstream_latency_seconds", "Time spent in upstream API calls"
+)
+UPSTREAM_RESPONSES = Counter(
+    "kpoisk_upstream_responses_total", "Upstream API responses by status code"
+)
+RENDER_LATENCY = Histogram(
+    "kpoisk_render_latency_seconds", "Time spent formatting a film"
+)
+LOOP_LAG = Histogram("kpoisk_event_loop_lag_seconds", "Event loop scheduling delay")
+
+
+class MetricsMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        name = data["handler"].callback.__name__ if "handler" in data else "unknown"
+        HANDLER_IN_FLIGHT.inc(handler=name)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=name)
+            raise
+        finally:
+            HANDLER_LATENCY.observe(time.perf_counter() - started, handler=name)
+            HANDLER_IN_FLIGHT.dec(handler=name)
+
+
+async def monitor_loop_lag(interval: float = 1.0) -> None:
+    """
+    Measure how late the event loop wakes up a sleeping task
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(loop.time() - started - interval, 0.0))
+
+
+async def metrics_view(request: web.Request) -> web.Response:
+    return web.Response(
+        text=REGISTRY.render(), content_type="text/plain", charset="utf-8"
+    )
+
+
+async def start_metrics_server(
+    host: str, port: int, routes: Iterable[web.RouteDef] = ()
+) -> web.AppRunner:
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_view)
+    app.add_routes(routes)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
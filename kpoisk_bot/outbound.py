@@ -0,0 +1,122 @@
+import logging
+from typing import Any, Hashable
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from .cache import TTLCache
+from .metrics import CallbackMetric
+from .ratelimit import Priority, RateLimiter
+
+# Bot API methods that send something to chats, the ones Telegram limits.
+# Answers to inline and callback queries don't count towards the limits and
+# are only useful within seconds, so they are never queued
+LIMITED_METHODS = ("send", "edit", "copy", "forward")
+
+
+class TunedAiohttpSession(AiohttpSession):
+    """
+    Bot session keeping more connections to Telegram alive for longer
+    """
+
+    def __init__(
+        self,
+        max_connections: int,
+        keepalive_timeout: float,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self._connector_init.update(
+            limit=max_connections,
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=300,
+        )
+
+
+class OutboundLimiter(BaseRequestMiddleware):
+    """
+    Keeps outgoing Bot API calls within the global and per-chat limits and
+    waits out the flood control instead of failing
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        chat_rate: float,
+        chat_burst: int,
+        attempts: int = 3,
+        chats: int = 10000,
+    ) -> None:
+        self.limiter = RateLimiter(rate, burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.attempts = attempts
+        self.chat_limiters: TTLCache[Hashable, RateLimiter] = TTLCache(chats)
+        self.retried = 0
+        CallbackMetric(
+            "kpoisk_telegram_retry_after_total",
+            "Bot API calls retried because of flood control",
+            "counter",
+            lambda: [({}, self.retried)],
+        )
+        CallbackMetric(
+            "kpoisk_telegram_queued",
+            "Bot API calls waiting for the global rate limit",
+            "gauge",
+            lambda: [({}, self.limiter.queued())],
+        )
+
+    def chat_limiter(self, method: TelegramMethod[Any]) -> RateLimiter | None:
+        chat = getattr(method, "chat_id", None) or getattr(
+            method, "inline_message_id", None
+        )
+        if chat is None:
+            return None
+        limiter = self.chat_limiters.get(chat)
+        if limiter is None:
+            limiter = RateLimiter(self.chat_rate, self.chat_burst)
+            self.chat_limiters.set(chat, limiter)
+        return limiter
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if not method.__api_method__.startswith(LIMITED_METHODS):
+            return await make_request(bot, method)
+
+        # The user waits for the chosen inline result to be filled in
+        priority = (
+            Priority.CHOSEN
+            if getattr(method, "inline_message_id", None)
+            else Priority.INTERACTIVE
+        )
+        chat_limiter = self.chat_limiter(method)
+        attempt = 1
+        while True:
+            if chat_limiter is not None:
+                await chat_limiter.acquire(priority)
+            await self.limiter.acquire(priority)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt >= self.attempts:
+                    raise
+                attempt += 1
+                self.retried += 1
+                logging.warning(
+                    f"Flood control on {method.__api_method__}, "
+                    f"retrying in {e.retry_after}s"
+                )
+                # The next acquire waits until the pause is over
+                (chat_limiter or self.limiter).pause(e.retry_after)
@@ -0,0 +1,84 @@
+import json
+import logging
+import os
+from typing import Dict, Generic, Hashable, List, Tuple, TypeVar
+
+from .cache import normalize_query
+
+K = TypeVar("K", bound=Hashable)
+
+
+class TopK(Generic[K]):
+    """
+    Space-Saving heavy hitters: approximate counts of the most frequent keys
+    in bounded memory. A key missing from a full table replaces the rarest
+    one and inherits its count, so counts are overestimated by at most that.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.counts: Dict[K, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def add(self, key: K, count: float = 1) -> None:
+        if key in self.counts:
+            self.counts[key] += count
+            return
+        if len(self.counts) >= self.capacity:
+            rarest = min(self.counts, key=self.counts.__getitem__)
+            count += self.counts.pop(rarest)
+        self.counts[key] = count
+
+    def top(self, n: int) -> List[Tuple[K, float]]:
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def decay(self, factor: float = 0.5) -> None:
+        """
+        Fade old counts, so that the top follows what is trending now
+        """
+        for key in self.counts:
+            self.counts[key] *= factor
+
+
+class Popularity:
+    """
+    Most frequent inline queries and chosen films
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.queries: TopK[str] = TopK(capacity)
+        self.films: TopK[int] = TopK(capacity)
+
+    def query(self, text: str) -> None:
+        if normalized := normalize_query(text):
+            self.queries.add(normalized)
+
+    def chosen(self, film_id: int) -> None:
+        self.films.add(film_id)
+
+    def save(self, path: str, top: int) -> None:
+        data = {
+            "queries": self.queries.top(top),
+            "films": self.films.top(top),
+        }
+        # Write a complete file first, so that a crash never leaves half of it
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temporary, path)
+
+    def load(self, path: str) -> None:
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError as e:
+            logging.warning(f"Ignoring unreadable popularity file {path}: {e}")
+            return
+        for query, count in data.get("queries", []):
+            self.queries.add(query, count)
+        for film_id, count in data.get("films", []):
+            self.films.add(int(film_id), count)
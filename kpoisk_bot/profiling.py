@@ -0,0 +1,185 @@
+"""
+On-demand diagnostics of a running bot: sampling profiles in the collapsed
+stack format read by flamegraph.pl and speedscope, a dump of the asyncio
+tasks and a watchdog reporting callbacks that block the event loop
+"""
+
+import asyncio
+import io
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Dict, List
+
+from .metrics import CallbackMetric
+
+
+def collapse(frame: FrameType | None) -> str:
+    """
+    Stack of `frame` from the outermost call, separated by semicolons
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename)
+        names.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def render_collapsed(samples: Counter[str]) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+
+def dump_tasks() -> str:
+    lines = []
+    for task in sorted(asyncio.all_tasks(), key=lambda task: task.get_name()):
+        stack = io.StringIO()
+        task.print_stack(file=stack)
+        lines.append(f"{task.get_name()}: {task.get_coro()!r}\n{stack.getvalue()}")
+    return "\n".join(lines)
+
+
+class Profiler:
+    """
+    Samples the stack of the event loop thread: by wall time from a helper
+    thread, which includes waiting in `select`, and by CPU time with
+    `SIGPROF`, which only fires while the process runs
+    """
+
+    def __init__(self, directory: str, duration: float, interval: float) -> None:
+        self.directory = directory
+        self.duration = duration
+        self.interval = interval
+        self.running = False
+        self.captured = 0
+        self._task: asyncio.Task | None = None
+
+    def _sample_wall(self, thread_id: int, stop: threading.Event) -> Counter[str]:
+        samples: Counter[str] = Counter()
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                samples[collapse(frame)] += 1
+        return samples
+
+    async def capture(self) -> List[str]:
+        """
+        Profile the bot for `duration` seconds, returns the written files
+        """
+        if self.running:
+            raise RuntimeError("A profile is already being captured")
+        self.running = True
+        try:
+            return await self._capture()
+        finally:
+            self.running = False
+
+    async def _capture(self) -> List[str]:
+        cpu: Counter[str] = Counter()
+        profiling_cpu = hasattr(signal, "setitimer")
+        if profiling_cpu:
+
+            def on_sigprof(signum: int, frame: FrameType | None) -> None:
+                cpu[collapse(frame)] += 1
+
+            previous = signal.signal(signal.SIGPROF, on_sigprof)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+        stop = threading.Event()
+        wall_sampler = asyncio.create_task(
+            asyncio.to_thread(self._sample_wall, threading.get_ident(), stop)
+        )
+        try:
+            await asyncio.sleep(self.duration)
+        finally:
+            stop.set()
+            wall = await wall_sampler
+            if profiling_cpu:
+                signal.setitimer(signal.ITIMER_PROF, 0)
+                signal.signal(signal.SIGPROF, previous)
+
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        outputs: Dict[str, str] = {
+            f"wall-{stamp}.folded": render_collapsed(wall),
+            f"tasks-{stamp}.txt": dump_tasks(),
+        }
+        if profiling_cpu:
+            outputs[f"cpu-{stamp}.folded"] = render_collapsed(cpu)
+        paths = []
+        for name, content in outputs.items():
+            path = os.path.join(self.directory, name)
+            with open(path, "w") as f:
+                f.write(content)
+            paths.append(path)
+        self.captured += 1
+        logging.info(f"Profile written to {', '.join(paths)}")
+        return paths
+
+    def trigger(self) -> None:
+        """
+        Capture a profile in the background, e.g. from a signal handler
+        """
+        self._task = asyncio.create_task(self._capture_quietly())
+
+    async def _capture_quietly(self) -> None:
+        try:
+            await self.capture()
+        except (RuntimeError, OSError) as e:
+            logging.warning(f"Profiling failed: {e}")
+
+
+class LoopWatchdog:
+    """
+    Logs the stack of the event loop thread whenever a single callback keeps
+    the loop busy for longer than `threshold` seconds. Unlike the asyncio
+    debug mode it costs nothing while the loop is responsive.
+    """
+
+    def __init__(self, threshold: float) -> None:
+        self.threshold = threshold
+        self.slow_callbacks = 0
+        self.beat = time.monotonic()
+        self._stop = threading.Event()
+        CallbackMetric(
+            "kpoisk_slow_callbacks_total",
+            "Callbacks blocking the event loop for longer than the threshold",
+            "counter",
+            lambda: [({}, self.slow_callbacks)],
+        )
+
+    async def heartbeat(self) -> None:
+        thread = threading.Thread(
+            target=self._watch,
+            args=(threading.get_ident(),),
+            name="loop-watchdog",
+            daemon=True,
+        )
+        thread.start()
+        try:
+            while True:
+                self.beat = time.monotonic()
+                await asyncio.sleep(self.threshold / 4)
+        finally:
+            self._stop.set()
+
+    def _watch(self, thread_id: int) -> None:
+        reported = None
+        while not self._stop.wait(self.threshold / 4):
+            beat = self.beat
+            if time.monotonic() - beat <= self.threshold or beat == reported:
+                continue
+            # Reported once per stall
+            reported = beat
+            self.slow_callbacks += 1
+            frame = sys._current_frames().get(thread_id)
+            logging.warning(
+                f"Event loop blocked for over {self.threshold}s in "
+                f"{collapse(frame)}"
+            )
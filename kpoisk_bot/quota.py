@@ -0,0 +1,51 @@
+import datetime
+from typing import Callable
+
+
+def utc_today() -> datetime.date:
+    return datetime.datetime.now(datetime.timezone.utc).date()
+
+
+class DailyQuota:
+    """
+    Local accounting of upstream calls against the daily API key quota
+    """
+
+    def __init__(
+        self, limit: int, today: Callable[[], datetime.date] = utc_today
+    ) -> None:
+        self.limit = limit
+        self.today = today
+        self.day = today()
+        self.used = 0
+        # The upstream itself reported the quota as spent
+        self.exhausted = False
+
+    def _roll(self) -> None:
+        day = self.today()
+        if day != self.day:
+            self.day = day
+            self.used = 0
+            self.exhausted = False
+
+    def spend(self, calls: int = 1) -> None:
+        self._roll()
+        self.used += calls
+
+    def exhaust(self) -> None:
+        """
+        Nothing is left until the next day, whatever the local accounting says
+        """
+        self._roll()
+        self.exhausted = True
+
+    def remaining(self) -> int:
+        self._roll()
+        if self.exhausted:
+            return 0
+        return max(self.limit - self.used, 0)
+
+    def fraction_left(self) -> float:
+        if self.limit <= 0:
+            return 0.0 if self.exhausted else 1.0
+        return self.remaining() / self.limit
@@ -0,0 +1,107 @@
+import asyncio
+import heapq
+import itertools
+import time
+from enum import IntEnum
+from typing import Callable, List, Tuple
+
+from httpx import HTTPError
+
+
+class Priority(IntEnum):
+    # The user waits for the edit of an already chosen result
+    CHOSEN = 0
+    # The user is typing an inline query or a message
+    INTERACTIVE = 1
+    # Nobody waits, e.g. prefetching and cache warming
+    SPECULATIVE = 2
+
+
+class RateLimited(HTTPError):
+    """
+    The upstream call was not made because of the rate limit
+    """
+
+
+class RateLimiter:
+    """
+    Token bucket serving queued callers in priority order
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.timer = timer
+        self.tokens = float(burst)
+        self.updated = timer()
+        self.paused_until = 0.0
+        self.limited = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._dispatcher: asyncio.Task | None = None
+
+    def _refill(self) -> None:
+        now = self.timer()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _ready(self) -> bool:
+        self._refill()
+        return self.tokens >= 1 and self.timer() >= self.paused_until
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stop issuing tokens, e.g. for the `Retry-After` of a 429 response
+        """
+        self.paused_until = max(self.paused_until, self.timer() + seconds)
+
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, priority: Priority, max_wait: float | None = None) -> bool:
+        """
+        Wait for a token, returns False if it wasn't issued within `max_wait`
+        """
+        if not self._waiters and self._ready():
+            self.tokens -= 1
+            return True
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        try:
+            await asyncio.wait_for(asyncio.shield(future), max_wait)
+            return True
+        except asyncio.TimeoutError:
+            if future.done():
+                # The token was issued right at the deadline, give it back
+                self.tokens += 1
+            else:
+                future.cancel()
+            self.limited += 1
+            return False
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.tokens += 1
+            future.cancel()
+            raise
+
+    async def _dispatch(self) -> None:
+        while self._waiters:
+            if self._ready():
+                _, _, future = heapq.heappop(self._waiters)
+                if not future.done():
+                    self.tokens -= 1
+                    future.set_result(None)
+                continue
+            delay = max(
+                (1 - self.tokens) / self.rate if self.rate > 0 else 1.0,
+                self.paused_until - self.timer(),
+            )
+            await asyncio.sleep(delay)
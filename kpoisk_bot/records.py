@@ -0,0 +1,173 @@
+from typing import Any, Dict, Tuple
+
+from kinopoisk_unofficial_api_client.models import Film, FilmSearchResponseFilms
+from kinopoisk_unofficial_api_client.types import Unset
+
+FILM_TYPES = frozenset({"FILM", "MINI_SERIES", "TV_SERIES", "TV_SHOW", "VIDEO"})
+
+
+def present(value: Any) -> Any:
+    """
+    Missing and `"null"` values of the generated models as `None`
+    """
+    return None if isinstance(value, Unset) or value == "null" else value
+
+
+def typed(data: Dict[str, Any], key: str, kind: type) -> Any:
+    value = present(data.get(key))
+    if value is not None and not isinstance(value, kind):
+        raise TypeError(f"{key} is {type(value).__name__}, expected {kind.__name__}")
+    return value
+
+
+def names(items: Any, key: str) -> Tuple[str, ...]:
+    return tuple(getattr(item, key) for item in present(items) or ())
+
+
+class FilmRecord:
+    """
+    Everything the bot shows about a film, normalized from either search
+    results or film details. Values are `None` when they are unknown.
+    """
+
+    __slots__ = (
+        "film_id",
+        "name_ru",
+        "name_en",
+        "type",
+        "year",
+        "description",
+        "film_length",
+        "genres",
+        "countries",
+        "rating",
+        "rating_vote_count",
+        "poster_url",
+        "poster_url_preview",
+    )
+
+    def __init__(
+        self,
+        film_id: int | None,
+        type: str,
+        name_ru: str | None = None,
+        name_en: str | None = None,
+        year: str | None = None,
+        description: str | None = None,
+        film_length: str | None = None,
+        genres: Tuple[str, ...] = (),
+        countries: Tuple[str, ...] = (),
+        rating: str | None = None,
+        rating_vote_count: int | None = None,
+        poster_url: str | None = None,
+        poster_url_preview: str | None = None,
+    ) -> None:
+        self.film_id = film_id
+        self.type = type
+        self.name_ru = name_ru
+        self.name_en = name_en
+        self.year = year
+        self.description = description
+        self.film_length = film_length
+        self.genres = genres
+        self.countries = countries
+        self.rating = rating
+        self.rating_vote_count = rating_vote_count
+        self.poster_url = poster_url
+        self.poster_url_preview = poster_url_preview
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, FilmRecord) and self.astuple() == other.astuple()
+
+    def __hash__(self) -> int:
+        return hash(self.astuple())
+
+    def __repr__(self) -> str:
+        return f"FilmRecord({self.film_id!r}, {self.name_ru!r})"
+
+    def astuple(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    @classmethod
+    def from_search(cls, film: FilmSearchResponseFilms) -> "FilmRecord":
+        return cls(
+            film_id=present(film.film_id),
+            type=str(film.type),
+            name_ru=present(film.name_ru),
+            name_en=present(film.name_en),
+            year=present(film.year),
+            description=present(film.description),
+            film_length=present(film.film_length),
+            genres=names(film.genres, "genre"),
+            countries=names(film.countries, "country"),
+            rating=present(film.rating),
+            rating_vote_count=present(film.rating_vote_count),
+            poster_url=present(film.poster_url),
+            poster_url_preview=present(film.poster_url_preview),
+        )
+
+    @classmethod
+    def from_film(cls, film: Film) -> "FilmRecord":
+        year = present(film.year)
+        film_length = present(film.film_length)
+        rating = present(film.rating_kinopoisk)
+        return cls(
+            film_id=film.kinopoisk_id,
+            type=str(film.type),
+            name_ru=present(film.name_ru),
+            name_en=present(film.name_en) or present(film.name_original),
+            year=str(year) if year else None,
+            description=present(film.description),
+            film_length=str(film_length) if film_length else None,
+            genres=names(film.genres, "genre"),
+            countries=names(film.countries, "country"),
+            rating=str(rating) if rating else None,
+            rating_vote_count=present(film.rating_kinopoisk_vote_count),
+            poster_url=present(film.poster_url),
+            poster_url_preview=present(film.poster_url_preview),
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FilmRecord":
+        """
+        Read a film in the search response format, raising on anything
+        unexpected rather than guessing
+        """
+        if data.get("type") not in FILM_TYPES:
+            raise ValueError(f"Unknown film type {data.get('type')!r}")
+        return cls(
+            film_id=typed(data, "filmId", int),
+            type=data["type"],
+            name_ru=typed(data, "nameRu", str),
+            name_en=typed(data, "nameEn", str),
+            year=typed(data, "year", str),
+            description=typed(data, "description", str),
+            film_length=typed(data, "filmLength", str),
+            genres=tuple(g["genre"] for g in data.get("genres") or ()),
+            countries=tuple(c["country"] for c in data.get("countries") or ()),
+            rating=typed(data, "rating", str),
+            rating_vote_count=typed(data, "ratingVoteCount", int),
+            poster_url=typed(data, "posterUrl", str),
+            poster_url_preview=typed(data, "posterUrlPreview", str),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        The film in the search response format, as stored in the `FilmIndex`
+        """
+        data = {
+            "filmId": self.film_id,
+            "nameRu": self.name_ru,
+            "nameEn": self.name_en,
+            "type": self.type,
+            "year": self.year,
+            "description": self.description,
+            "filmLength": self.film_length,
+            "genres": [{"genre": genre} for genre in self.genres],
+            "countries": [{"country": country} for country in self.countries],
+            "rating": self.rating,
+            "ratingVoteCount": self.rating_vote_count,
+            "posterUrl": self.poster_url,
+            "posterUrlPreview": self.poster_url_preview,
+        }
+        return {key: value for key, value in data.items() if value is not None}
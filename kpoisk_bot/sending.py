@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Sequence
+
+from aiogram.types import InputTextMessageContent
+
+# Telegram limit for the text of a single message, in UTF-16 code units
+MESSAGE_LENGTH = 4096
+SEPARATOR = "\n\n"
+
+
+def utf16_length(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+async def send_all(
+    sends: Sequence[Callable[[], Awaitable[Any]]], concurrency: int = 1
+) -> List[Any]:
+    """
+    Run `sends` starting them in order, at most `concurrency` at a time.
+
+    Only with `concurrency=1` messages are guaranteed to arrive in order.
+    A failed send is logged and doesn't stop the others. Flood control is
+    waited out by `OutboundLimiter` in the bot session, not here.
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run(send: Callable[[], Awaitable[Any]]) -> Any:
+        async with semaphore:
+            return await send()
+
+    results = await asyncio.gather(*map(run, sends), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logging.error(result)
+    return results
+
+
+def combine_messages(
+    contents: Sequence[InputTextMessageContent], limit: int = MESSAGE_LENGTH
+) -> List[InputTextMessageContent]:
+    """
+    Join formatted messages into as few messages as fit into `limit`
+    """
+    combined: List[InputTextMessageContent] = []
+    for content in contents:
+        if combined:
+            last = combined[-1]
+            offset = utf16_length(last.message_text + SEPARATOR)
+            if offset + utf16_length(content.message_text) <= limit:
+                combined[-1] = last.model_copy(
+                    update={
+                        "message_text": last.message_text
+                        + SEPARATOR
+                        + content.message_text,
+                        "entities": (last.entities or [])
+                        + [
+                            entity.model_copy(update={"offset": entity.offset + offset})
+                            for entity in content.entities or []
+                        ],
+                    }
+                )
+                continue
+        combined.append(content)
+    return combined
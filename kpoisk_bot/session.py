@@ -1,23 +1,739 @@
+import asyncio
 import logging
-from typing import Any, Awaitable, Callable, Dict
+import time
+from http import HTTPStatus
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Dict,
+    Iterable,
+    List,
+    Set,
+    Tuple,
+)
 
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
-from kinopoisk_unofficial_api_client import AuthenticatedClient
+from httpx import HTTPError, Limits, Timeout
+from kinopoisk_unofficial_api_client import AuthenticatedClient, Client
+from kinopoisk_unofficial_api_client.models import Film, FilmSearchResponse
+from kinopoisk_unofficial_api_client.types import Response
 
-from .config import API_TOKEN, API_URL
+from .backends import CacheBackend, create_backend, dumps, loads
+from .bloom import EmptyPrefixes
+from .breaker import CircuitBreaker, CircuitOpen
+from .cache import CacheStats, TTLCache, normalize_query
+from .capture import TrafficLog
+from .config import (
+    API_DAILY_QUOTA,
+    API_TOKEN,
+    API_URL,
+    BREAKER_RESET,
+    BREAKER_THRESHOLD,
+    CACHE_BACKEND,
+    EMPTY_FILTER_CAPACITY,
+    EMPTY_FILTER_ERROR_RATE,
+    EMPTY_FILTER_TTL,
+    EMPTY_PREFIX_MIN_LENGTH,
+    FAST_DECODE,
+    FILM_CACHE_SIZE,
+    FILM_BURST,
+    FILM_CACHE_TTL,
+    FILM_RATE,
+    HTTP2,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE,
+    HTTP_POOL_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_WARMUP_CONNECTIONS,
+    HTTP_WRITE_TIMEOUT,
+    INDEX_CACHE_KB,
+    INDEX_PATH,
+    NEGATIVE_CACHE_TTL,
+    PREFETCH_CONCURRENCY,
+    PREFETCH_COUNT,
+    PREFETCH_QUOTA_RESERVE,
+    RATE_LIMIT_MAX_WAIT,
+    SEARCH_BURST,
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_TTL,
+    SEARCH_RATE,
+    SNAPSHOT_PATH,
+    STALE_TTL,
+    WARM_TOP_K,
+)
+from .decode import LazyFilms, SearchResult, decode_film, decode_search
+from .index import FilmIndex
+from .metrics import UPSTREAM_LATENCY, UPSTREAM_RESPONSES, CallbackMetric
+from .popularity import Popularity
+from .quota import DailyQuota
+from .ratelimit import Priority, RateLimited, RateLimiter
+from .records import FilmRecord
+from .singleflight import SingleFlight
+from .snapshot import load_snapshot, save_snapshot
+from .timing import RequestTimings
 
+# Number of films in a page of upstream search results
+SEARCH_PAGE_SIZE = 20
+SEARCH_PATH = "/api/v2.1/films/search-by-keyword"
 
-class ApiMiddleware(BaseMiddleware):
+
+class Refused(HTTPError):
+    """
+    The upstream refused the call, e.g. for a bad API key or a spent quota
+    """
+
+
+def flight_key(key: Tuple[Any, ...], priority: Priority) -> Tuple[Any, ...]:
+    """
+    Speculative calls wait for the rate limit without a deadline, callers
+    that can't wait don't join them but make a call of their own
+    """
+    return key + ("speculative",) if priority == Priority.SPECULATIVE else key
+
+
+class PrefetchStats:
     def __init__(self) -> None:
-        self.client = AuthenticatedClient(base_url=API_URL, token=API_TOKEN)
+        self.issued = 0
+        self.hits = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def hit_rate(self) -> float:
+        return self.hits / self.issued if self.issued else 0.0
+
+
+class KinopoiskApi:
+    """
+    Caching facade over the generated API client used by the handlers
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        index: FilmIndex | None = None,
+        backend: CacheBackend | None = None,
+    ) -> None:
+        self.client = client
+        self.index = index
+        self.backend = backend
+        self.shared_stats = CacheStats()
+        self.search_cache: TTLCache[Tuple[str, int], SearchResult] = TTLCache(
+            SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL
+        )
+        self.film_cache: TTLCache[int, FilmRecord] = TTLCache(
+            FILM_CACHE_SIZE, FILM_CACHE_TTL
+        )
+        # Film ids the upstream doesn't know, the value is unused
+        self.missing_films: TTLCache[int, bool] = TTLCache(
+            FILM_CACHE_SIZE, NEGATIVE_CACHE_TTL
+        )
+        self.missing_film_hits = 0
+        self.empty_prefixes = EmptyPrefixes(
+            EMPTY_FILTER_CAPACITY,
+            EMPTY_FILTER_ERROR_RATE,
+            EMPTY_FILTER_TTL,
+            EMPTY_PREFIX_MIN_LENGTH,
+        )
+        self.flight = SingleFlight()
+        self.quota = DailyQuota(API_DAILY_QUOTA)
+        self.search_limiter = RateLimiter(SEARCH_RATE, SEARCH_BURST)
+        self.film_limiter = RateLimiter(FILM_RATE, FILM_BURST)
+        self.breakers = {
+            endpoint: CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET)
+            for endpoint in ("search", "film")
+        }
+        self.stale_served = 0
+        self.prefetch_stats = PrefetchStats()
+        # Several times more candidates than are warmed keeps the top accurate
+        self.popularity = Popularity(WARM_TOP_K * 10)
+        self._prefetched: TTLCache[int, bool] = TTLCache(
+            FILM_CACHE_SIZE, FILM_CACHE_TTL
+        )
+        self._prefetch_semaphore = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def _limit(
+        self,
+        endpoint: str,
+        limiter: RateLimiter,
+        priority: Priority,
+        fn: Callable[[], Awaitable[Response]],
+    ) -> Any:
+        """
+        Make an upstream call within the rate limit and return its parsed result
+        """
+        max_wait = None if priority == Priority.SPECULATIVE else RATE_LIMIT_MAX_WAIT
+        if not await limiter.acquire(priority, max_wait):
+            raise RateLimited("Upstream rate limit exceeded")
+        breaker = self.breakers[endpoint]
+        if not breaker.allow():
+            raise CircuitOpen(f"Upstream {endpoint} calls keep failing")
+        self.quota.spend()
+        started = time.perf_counter()
+        try:
+            response = await fn()
+        except HTTPError:
+            UPSTREAM_RESPONSES.inc(endpoint=endpoint, status="error")
+            breaker.failure()
+            raise
+        finally:
+            UPSTREAM_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint)
+        UPSTREAM_RESPONSES.inc(endpoint=endpoint, status=int(response.status_code))
+        if response.status_code >= 500:
+            breaker.failure()
+            raise HTTPError(f"Upstream responded with {int(response.status_code)}")
+        breaker.success()
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After", "1")
+            limiter.pause(float(retry_after) if retry_after.isdigit() else 1.0)
+            raise RateLimited(f"Upstream asked to retry after {retry_after}s")
+        if response.status_code == HTTPStatus.PAYMENT_REQUIRED:
+            # The daily quota of the API key is spent, stop speculative calls
+            self.quota.exhaust()
+        # A missing film is an answer, anything else must not be cached
+        if response.status_code >= 400 and response.status_code != HTTPStatus.NOT_FOUND:
+            raise Refused(f"Upstream refused the call with {int(response.status_code)}")
+        return response.parsed
+
+    async def search(
+        self, keyword: str, page: int = 1, priority: Priority = Priority.INTERACTIVE
+    ) -> SearchResult | None:
+        key = (normalize_query(keyword), page)
+        cached = self.search_cache.get(key)
+        if cached is not None:
+            return cached
+        if self.empty_prefixes.covers(key[0]):
+            return SearchResult(keyword, 0, 0, LazyFilms([]))
+        return await self._revalidate(
+            ("search",) + key,
+            self.search_cache.get_stale(key, STALE_TTL),
+            lambda priority: self._search(*key, priority),
+            priority,
+        )
+
+    async def _revalidate(
+        self,
+        key: Tuple[Any, ...],
+        stale: Any,
+        fetch: Callable[[Priority], Awaitable[Any]],
+        priority: Priority,
+    ) -> Any:
+        """
+        Serve an expired entry right away and refresh it in the background,
+        or wait for `fetch` if there is nothing to serve
+        """
+        if stale is None:
+            return await self.flight.do(
+                flight_key(key, priority), lambda: fetch(priority)
+            )
+        self.stale_served += 1
+        self._spawn(
+            self._quietly(
+                self.flight.do(
+                    flight_key(key, Priority.SPECULATIVE),
+                    lambda: fetch(Priority.SPECULATIVE),
+                )
+            )
+        )
+        return stale
+
+    async def search_slice(
+        self, keyword: str, offset: int, limit: int
+    ) -> Tuple[List[FilmRecord], int | None]:
+        """
+        Films from `offset` to `offset + limit` across upstream result pages,
+        along with the offset of the following slice if there are more films
+        """
+        first_page = offset // SEARCH_PAGE_SIZE + 1
+        last_page = (offset + limit - 1) // SEARCH_PAGE_SIZE + 1
+        films: List[FilmRecord] = []
+        total = 0
+        pages_count = 1
+        start = offset - (first_page - 1) * SEARCH_PAGE_SIZE
+        for page in range(first_page, last_page + 1):
+            result = await self.search(keyword, page)
+            if result is None or not result.films:
+                break
+            # Slice each page, so that lazily decoded films are only decoded
+            # when they are shown
+            stop = start + limit - len(films)
+            films.extend(result.films[start:stop])
+            start = max(start - len(result.films), 0)
+            total = result.search_films_count_result or 0
+            pages_count = max(result.pages_count or 0, page)
+            if page >= pages_count:
+                break
+
+        end = offset + len(films)
+        if len(films) < limit or end >= min(total, pages_count * SEARCH_PAGE_SIZE):
+            return films, None
+        if end + limit > last_page * SEARCH_PAGE_SIZE and last_page < pages_count:
+            # The user is scrolling towards the next upstream page, load it
+            self._spawn(
+                self._quietly(self.search(keyword, last_page + 1, Priority.SPECULATIVE))
+            )
+        return films, end
+
+    def is_cached(self, keyword: str, page: int = 1) -> bool:
+        """
+        Whether the search is answered from a fresh cache entry
+        """
+        return (normalize_query(keyword), page) in self.search_cache
+
+    def peek_search(self, keyword: str) -> List[FilmRecord]:
+        """
+        Answer from the cache only: either the query itself or its longest
+        cached prefix, narrowed down to the titles matching the whole query
+        """
+        normalized = normalize_query(keyword)
+        for end in range(len(normalized), 0, -1):
+            cached = self.search_cache.peek((normalized[:end], 1))
+            if cached is None:
+                continue
+            films = list(cached.films or [])
+            if end == len(normalized):
+                return films
+            return [
+                film
+                for film in films
+                if normalized in normalize_query(film.name_ru or "")
+                or normalized in normalize_query(film.name_en or "")
+            ]
+        return []
+
+    async def _load(self, key: str) -> Dict[str, Any] | None:
+        if self.backend is None:
+            return None
+        try:
+            raw = await self.backend.get(key)
+        except Exception as e:
+            logging.warning(f"Shared cache read of {key} failed: {e}")
+            raw = None
+        if raw is None:
+            self.shared_stats.misses += 1
+            return None
+        self.shared_stats.hits += 1
+        return loads(raw)
+
+    async def _store(self, key: str, data: Dict[str, Any], ttl: float) -> None:
+        if self.backend is None:
+            return
+        try:
+            await self.backend.set(key, dumps(data), ttl)
+        except Exception as e:
+            logging.warning(f"Shared cache write of {key} failed: {e}")
+
+    async def _search(
+        self, keyword: str, page: int, priority: Priority
+    ) -> SearchResult | None:
+        shared_key = f"search:{page}:{keyword}"
+        if (shared := await self._load(shared_key)) is not None:
+            result = SearchResult.from_dict(shared)
+            self._cache_search(keyword, page, result)
+            return result
+
+        result = await self._limit(
+            "search",
+            self.search_limiter,
+            priority,
+            lambda: (
+                self._fetch_search(keyword, page)
+                if FAST_DECODE
+                else self._fetch_search_model(keyword, page)
+            ),
+        )
+        if isinstance(result, FilmSearchResponse):
+            result = SearchResult.from_model(result)
+        if isinstance(result, SearchResult):
+            self._cache_search(keyword, page, result)
+            data = result.to_dict()
+            await self._store(
+                shared_key,
+                data,
+                SEARCH_CACHE_TTL if result.films else NEGATIVE_CACHE_TTL,
+            )
+            if self.index is not None and data.get("films"):
+                self._index(data["films"])
+        return result
+
+    def _cache_search(self, keyword: str, page: int, result: SearchResult) -> None:
+        if result.films:
+            self.search_cache.set((keyword, page), result)
+            return
+        # Nothing found is likely a typo, checked again sooner
+        self.search_cache.set((keyword, page), result, NEGATIVE_CACHE_TTL)
+        if page == 1:
+            self.empty_prefixes.add(keyword)
+
+    async def _fetch_search(self, keyword: str, page: int) -> Response:
+        """
+        Search request decoded with `decode_search` instead of the generated
+        models
+        """
+        response = await self.client.get_async_httpx_client().get(
+            SEARCH_PATH, params={"keyword": keyword, "page": page}
+        )
+        return Response(
+            status_code=HTTPStatus(response.status_code),
+            content=response.content,
+            headers=response.headers,
+            parsed=(
+                decode_search(response.content)
+                if response.status_code == HTTPStatus.OK
+                else None
+            ),
+        )
+
+    async def _fetch_search_model(self, keyword: str, page: int) -> Response:
+        # Generated endpoint modules are imported on first use to start faster
+        from kinopoisk_unofficial_api_client.api.films import (
+            get_api_v2_1_films_search_by_keyword,
+        )
+
+        return await get_api_v2_1_films_search_by_keyword.asyncio_detailed(
+            client=self.client, keyword=keyword, page=page
+        )
+
+    def _index(self, films: List[Dict[str, Any]]) -> None:
+        """
+        Add films to the local index in a worker thread, off the event loop
+        """
+        assert self.index is not None
+        self._spawn(self._quietly(asyncio.to_thread(self.index.add, films)))
+
+    async def local_search(
+        self, keyword: str, limit: int, fuzzy: bool = True
+    ) -> List[FilmRecord]:
+        """
+        Films from the local index, searched in a worker thread
+        """
+        if self.index is None:
+            return []
+        films = await asyncio.to_thread(self.index.search, keyword, limit, fuzzy)
+        return [decode_film(film) for film in films]
+
+    async def get_film(
+        self, film_id: int, priority: Priority = Priority.CHOSEN
+    ) -> FilmRecord | None:
+        cached = self.film_cache.get(film_id)
+        if cached is not None:
+            if self._prefetched.pop(film_id):
+                self.prefetch_stats.hits += 1
+            return cached
+        if film_id in self.missing_films:
+            self.missing_film_hits += 1
+            return None
+        return await self._revalidate(
+            ("film", film_id),
+            self.film_cache.get_stale(film_id, STALE_TTL),
+            lambda priority: self._get_film(film_id, priority),
+            priority,
+        )
+
+    async def _get_film(self, film_id: int, priority: Priority) -> FilmRecord | None:
+        shared_key = f"film-record:{film_id}"
+        if (shared := await self._load(shared_key)) is not None:
+            record = decode_film(shared)
+            self.film_cache.set(film_id, record)
+            return record
+
+        result = await self._limit(
+            "film", self.film_limiter, priority, lambda: self._fetch_film(film_id)
+        )
+        if not isinstance(result, Film):
+            return None
+        record = FilmRecord.from_film(result)
+        self.film_cache.set(film_id, record)
+        data = record.to_dict()
+        await self._store(shared_key, data, FILM_CACHE_TTL)
+        if self.index is not None:
+            self._index([data])
+        return record
+
+    async def _fetch_film(self, film_id: int) -> Response:
+        from kinopoisk_unofficial_api_client.api.films import get_api_v2_2_films_id
+
+        response = await get_api_v2_2_films_id.asyncio_detailed(
+            id=film_id, client=self.client
+        )
+        if response.status_code == HTTPStatus.NOT_FOUND:
+            self.missing_films.set(film_id, True)
+        return response
+
+    def prefetch_budget(self) -> int:
+        if self.quota.fraction_left() <= PREFETCH_QUOTA_RESERVE:
+            return 0
+        return round(PREFETCH_COUNT * self.quota.fraction_left())
+
+    def prefetch(self, film_ids: Iterable[int]) -> None:
+        """
+        Speculatively load film details in the background, so that
+        `get_film` can be answered from the cache later
+        """
+        budget = self.prefetch_budget()
+        for film_id in film_ids:
+            if not film_id or film_id in self.film_cache:
+                continue
+            if budget <= 0:
+                self.prefetch_stats.skipped += 1
+                continue
+            budget -= 1
+            self.prefetch_stats.issued += 1
+            self._spawn(self._prefetch(film_id))
+
+    async def _prefetch(self, film_id: int) -> None:
+        async with self._prefetch_semaphore:
+            if film_id in self.film_cache:
+                return
+            try:
+                film = await self.flight.do(
+                    flight_key(("film", film_id), Priority.SPECULATIVE),
+                    lambda: self._get_film(film_id, Priority.SPECULATIVE),
+                )
+            except Exception as e:
+                self.prefetch_stats.failed += 1
+                logging.debug(f"Prefetch of film {film_id} failed: {e}")
+                return
+            if film is not None:
+                self._prefetched.set(film_id, True)
+
+    def _spawn(self, coro: Coroutine[Any, Any, Any]) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _quietly(self, coro: Awaitable[Any]) -> None:
+        try:
+            await coro
+        except Exception as e:
+            logging.debug(f"Background API call failed: {e}")
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.index is not None:
+            self.index.close()
+        if self.backend is not None:
+            await self.backend.close()
+
+
+class ApiMiddleware(BaseMiddleware):
+    def __init__(self, capture: TrafficLog | None = None) -> None:
+        self.timings = RequestTimings()
+        event_hooks = self.timings.event_hooks()
+        if capture is not None:
+            event_hooks.update(capture.event_hooks())
+        self.client = AuthenticatedClient(
+            base_url=API_URL,
+            token=API_TOKEN,
+            timeout=Timeout(
+                connect=HTTP_CONNECT_TIMEOUT,
+                read=HTTP_READ_TIMEOUT,
+                write=HTTP_WRITE_TIMEOUT,
+                pool=HTTP_POOL_TIMEOUT,
+            ),
+            httpx_args={
+                "limits": Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+                ),
+                "http2": HTTP2,
+                "event_hooks": event_hooks,
+            },
+        )
+        self.api = KinopoiskApi(
+            self.client,
+            FilmIndex(INDEX_PATH, INDEX_CACHE_KB) if INDEX_PATH else None,
+            create_backend(CACHE_BACKEND),
+        )
+
+        self.register_metrics()
+
+    def register_metrics(self) -> None:
+        api = self.api
+        caches = {
+            "search": api.search_cache.stats,
+            "film": api.film_cache.stats,
+            "shared": api.shared_stats,
+        }
+        limiters = {"search": api.search_limiter, "film": api.film_limiter}
+        for event in ("hits", "misses", "evictions"):
+            CallbackMetric(
+                f"kpoisk_cache_{event}_total",
+                f"Cache {event}",
+                "counter",
+                lambda event=event: (
+                    ({"cache": name}, getattr(stats, event))
+                    for name, stats in caches.items()
+                ),
+            )
+        CallbackMetric(
+            "kpoisk_upstream_calls_total",
+            "Upstream calls by whether they were issued or coalesced",
+            "counter",
+            lambda: [
+                ({"kind": "issued"}, api.flight.calls),
+                ({"kind": "coalesced"}, api.flight.coalesced),
+            ],
+        )
+        CallbackMetric(
+            "kpoisk_prefetch_total",
+            "Film prefetches by outcome",
+            "counter",
+            lambda: (
+                ({"outcome": outcome}, getattr(api.prefetch_stats, outcome))
+                for outcome in ("issued", "hits", "failed", "skipped")
+            ),
+        )
+        CallbackMetric(
+            "kpoisk_negative_hits_total",
+            "Lookups answered as known to find nothing without going upstream",
+            "counter",
+            lambda: [
+                ({"kind": "empty_prefix"}, api.empty_prefixes.hits),
+                ({"kind": "missing_film"}, api.missing_film_hits),
+            ],
+        )
+        CallbackMetric(
+            "kpoisk_quota_remaining",
+            "Upstream calls left in the daily quota by local accounting",
+            "gauge",
+            lambda: [({}, api.quota.remaining())],
+        )
+        CallbackMetric(
+            "kpoisk_rate_limited_total",
+            "Upstream calls refused by the rate limiter",
+            "counter",
+            lambda: (
+                ({"endpoint": name}, limiter.limited)
+                for name, limiter in limiters.items()
+            ),
+        )
+        CallbackMetric(
+            "kpoisk_rate_limit_queued",
+            "Upstream calls waiting for the rate limiter",
+            "gauge",
+            lambda: (
+                ({"endpoint": name}, limiter.queued())
+                for name, limiter in limiters.items()
+            ),
+        )
+        CallbackMetric(
+            "kpoisk_circuit_open",
+            "Whether upstream calls are stopped by the circuit breaker",
+            "gauge",
+            lambda: (
+                ({"endpoint": name}, int(breaker.state() == CircuitBreaker.OPEN))
+                for name, breaker in api.breakers.items()
+            ),
+        )
+        CallbackMetric(
+            "kpoisk_circuit_rejected_total",
+            "Upstream calls refused by the circuit breaker",
+            "counter",
+            lambda: (
+                ({"endpoint": name}, breaker.rejected)
+                for name, breaker in api.breakers.items()
+            ),
+        )
+        CallbackMetric(
+            "kpoisk_stale_served_total",
+            "Expired cache entries served instead of an upstream call",
+            "counter",
+            lambda: [({}, api.stale_served)],
+        )
+        CallbackMetric(
+            "kpoisk_upstream_phase_seconds_avg",
+            "Mean duration of upstream request phases",
+            "gauge",
+            lambda: (
+                ({"phase": phase}, stats.mean())
+                for phase, stats in self.timings.phases.items()
+            ),
+        )
 
     async def init(self) -> None:
+        """
+        Open the API connections and the shared cache and load the cache
+        snapshot, all at the same time
+        """
+        backend = self.api.backend
+        await asyncio.gather(
+            self.connect(),
+            backend.open() if backend is not None else asyncio.sleep(0),
+            self.load_snapshot(),
+        )
+
+    async def connect(self) -> None:
         await self.client.__aenter__()
+        await self.warm_up()
         logging.info(f"Established connection to API at {API_URL}")
 
+    async def load_snapshot(self) -> None:
+        if not SNAPSHOT_PATH:
+            return
+        loaded = await asyncio.to_thread(
+            load_snapshot,
+            SNAPSHOT_PATH,
+            self.api.search_cache,
+            self.api.film_cache,
+            STALE_TTL,
+        )
+        logging.info(f"Loaded {loaded} cache entries from {SNAPSHOT_PATH}")
+
+    def save_snapshot(self) -> None:
+        if not SNAPSHOT_PATH:
+            return
+        try:
+            save_snapshot(SNAPSHOT_PATH, self.api.search_cache, self.api.film_cache)
+        except OSError as e:
+            logging.warning(f"Saving cache snapshot to {SNAPSHOT_PATH} failed: {e}")
+
+    async def warm_up(self) -> None:
+        """
+        Open keep-alive connections in advance, so that the first users
+        don't pay for the TCP and TLS handshakes
+        """
+        httpx_client = self.client.get_async_httpx_client()
+        results = await asyncio.gather(
+            *[httpx_client.head("/") for _ in range(HTTP_WARMUP_CONNECTIONS)],
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, HTTPError):
+                logging.warning(f"API connection warm-up failed: {result}")
+
     async def on_shutdown(self) -> None:
+        self.save_snapshot()
+        await self.api.close()
         await self.client.__aexit__()
+        stats = self.api.search_cache.stats
+        logging.info(
+            f"Search cache: {stats.hits} hits, {stats.misses} misses, "
+            f"{stats.evictions} evictions"
+        )
+        shared = self.api.shared_stats
+        logging.info(f"Shared cache: {shared.hits} hits, {shared.misses} misses")
+        logging.info(
+            f"Rate limited: {self.api.search_limiter.limited} searches, "
+            f"{self.api.film_limiter.limited} films, "
+            f"{self.api.stale_served} stale answers"
+        )
+        flight = self.api.flight
+        logging.info(f"API calls: {flight.calls} issued, {flight.coalesced} coalesced")
+        prefetch = self.api.prefetch_stats
+        logging.info(
+            f"Prefetch: {prefetch.issued} issued, {prefetch.hits} hits, "
+            f"{prefetch.failed} failed, {prefetch.skipped} skipped"
+        )
+        logging.info(f"API request timings: {self.timings.summary()}")
         logging.info("Shut down API connection")
 
     async def __call__(
@@ -27,4 +743,5 @@ class ApiMiddleware(BaseMiddleware):
         data: Dict[str, Any],
     ) -> Any:
         data["api_client"] = self.client
+        data["api"] = self.api
         return await handler(event, data)
@@ -0,0 +1,57 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class Abandoned(Exception):
+    """
+    The caller making the shared call was cancelled
+    """
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into a single in-flight call
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.coalesced = 0
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        while future is not None:
+            try:
+                # Shield the shared future, so that a cancelled waiter doesn't
+                # cancel the call for everyone else
+                return await asyncio.shield(future)
+            except Abandoned:
+                # The first waiter to wake up makes the call again
+                future = self._inflight.get(key)
+
+        self.calls += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_exception(Abandoned())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
@@ -0,0 +1,87 @@
+"""
+Snapshot of the in-process caches written on shutdown and read on startup,
+so that a restarted bot doesn't begin with empty caches
+"""
+
+import logging
+import mmap
+import os
+import time
+from typing import Tuple
+
+from .backends import dumps, loads
+from .cache import TTLCache
+from .decode import SearchResult, decode_film
+from .records import FilmRecord
+
+
+def save_snapshot(
+    path: str,
+    search_cache: TTLCache[Tuple[str, int], SearchResult],
+    film_cache: TTLCache[int, FilmRecord],
+) -> None:
+    data = {
+        "saved": time.time(),
+        "search": [
+            [keyword, page, ttl, result.to_dict()]
+            for (keyword, page), result, ttl in search_cache.entries()
+        ],
+        "films": [
+            [film_id, ttl, film.to_dict()]
+            for film_id, film, ttl in film_cache.entries()
+        ],
+    }
+    # Every worker of a multi-process bot writes its own on shutdown
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(dumps(data))
+    os.replace(temporary, path)
+
+
+def load_snapshot(
+    path: str,
+    search_cache: TTLCache[Tuple[str, int], SearchResult],
+    film_cache: TTLCache[int, FilmRecord],
+    max_staleness: float,
+) -> int:
+    """
+    Fill the caches from the snapshot, skipping entries expired more than
+    `max_staleness` seconds ago, returns the number of entries loaded
+    """
+    try:
+        with open(path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapped:
+            # Decoded straight from the page cache without reading into a copy
+            with memoryview(mapped) as view:
+                data = loads(view)
+    except FileNotFoundError:
+        return 0
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable cache snapshot {path}: {e}")
+        return 0
+
+    try:
+        age = time.time() - data["saved"]
+        searches, films = data["search"], data["films"]
+    except (KeyError, TypeError) as e:
+        logging.warning(f"Ignoring cache snapshot {path} of unknown format: {e!r}")
+        return 0
+    loaded = 0
+    for keyword, page, ttl, result in searches:
+        if ttl is not None and ttl - age + max_staleness <= 0:
+            continue
+        search_cache.set(
+            (keyword, page),
+            SearchResult.from_dict(result),
+            ttl - age if ttl is not None else None,
+        )
+        loaded += 1
+    for film_id, ttl, film in films:
+        if ttl is not None and ttl - age + max_staleness <= 0:
+            continue
+        film_cache.set(
+            film_id, decode_film(film), ttl - age if ttl is not None else None
+        )
+        loaded += 1
+    return loaded
@@ -0,0 +1,77 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+import httpx
+
+# httpcore trace events that end a measured phase, and where the phase starts
+PHASES = {
+    "connection.connect_tcp.complete": ("connect", "connection.connect_tcp.started"),
+    "connection.start_tls.complete": ("tls", "connection.start_tls.started"),
+    "http11.receive_response_headers.complete": (
+        "ttfb",
+        "http11.send_request_headers.started",
+    ),
+    "http2.receive_response_headers.complete": (
+        "ttfb",
+        "http2.send_request_headers.started",
+    ),
+}
+
+
+class PhaseStats:
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class RequestTimings:
+    """
+    Per-phase timings of outgoing requests collected with httpcore tracing.
+
+    The connect phase includes DNS resolution, as httpcore doesn't trace it
+    separately. It is only present for requests that opened a new connection.
+    """
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, PhaseStats] = {
+            phase: PhaseStats() for phase in ("connect", "tls", "ttfb", "total")
+        }
+
+    def tracer(self) -> Callable[[str, Dict[str, Any]], Awaitable[None]]:
+        started: Dict[str, float] = {}
+        first = time.perf_counter()
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            now = time.perf_counter()
+            if event.endswith(".started"):
+                started[event] = now
+            elif event in PHASES:
+                phase, start = PHASES[event]
+                if start in started:
+                    self.phases[phase].observe(now - started[start])
+                if phase == "ttfb":
+                    self.phases["total"].observe(now - first)
+
+        return trace
+
+    def event_hooks(self) -> Dict[str, list]:
+        async def on_request(request: httpx.Request) -> None:
+            request.extensions["trace"] = self.tracer()
+
+        return {"request": [on_request]}
+
+    def summary(self) -> str:
+        return ", ".join(
+            f"{phase} {stats.mean() * 1000:.1f}ms avg/{stats.max * 1000:.1f}ms max"
+            for phase, stats in self.phases.items()
+            if stats.count
+        )
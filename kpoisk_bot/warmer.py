@@ -0,0 +1,86 @@
+import asyncio
+import logging
+
+from .metrics import CallbackMetric
+from .ratelimit import Priority
+from .session import KinopoiskApi
+
+
+class CacheWarmer:
+    """
+    Refreshes the search results and film details of the most popular
+    queries and films, spending at most `quota_share` of the quota left
+    """
+
+    def __init__(
+        self,
+        api: KinopoiskApi,
+        path: str,
+        top: int,
+        interval: float,
+        quota_share: float,
+        persist: bool = True,
+    ) -> None:
+        self.api = api
+        self.path = path
+        self.top = top
+        self.interval = interval
+        self.quota_share = quota_share
+        self.persist = persist
+        self.warmed = 0
+        self.first_pass = asyncio.Event()
+        CallbackMetric(
+            "kpoisk_cache_warmed_total",
+            "Popular cache entries loaded in advance",
+            "counter",
+            lambda: [({}, self.warmed)],
+        )
+
+    async def warm(self) -> int:
+        """
+        Load popular entries missing from the caches, returns how many
+        """
+        api = self.api
+        floor = api.quota.remaining() - int(api.quota.remaining() * self.quota_share)
+        warmed = 0
+        for query, _ in api.popularity.queries.top(self.top):
+            if api.quota.remaining() <= floor:
+                break
+            if (query, 1) in api.search_cache:
+                continue
+            try:
+                await api.search(query, priority=Priority.SPECULATIVE)
+                warmed += 1
+            except Exception as e:
+                logging.debug(f"Warming search {query!r} failed: {e}")
+        for film_id, _ in api.popularity.films.top(self.top):
+            if api.quota.remaining() <= floor:
+                break
+            if film_id in api.film_cache:
+                continue
+            try:
+                await api.get_film(film_id, priority=Priority.SPECULATIVE)
+                warmed += 1
+            except Exception as e:
+                logging.debug(f"Warming film {film_id} failed: {e}")
+        self.warmed += warmed
+        return warmed
+
+    def save(self) -> None:
+        if not self.persist:
+            return
+        try:
+            self.api.popularity.save(self.path, self.top)
+        except OSError as e:
+            logging.warning(f"Saving popularity to {self.path} failed: {e}")
+
+    async def run(self) -> None:
+        self.api.popularity.load(self.path)
+        while True:
+            warmed = await self.warm()
+            self.first_pass.set()
+            logging.info(f"Warmed {warmed} popular cache entries")
+            await asyncio.sleep(self.interval)
+            self.save()
+            self.api.popularity.queries.decay()
+            self.api.popularity.films.decay()
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from kpoisk_bot.admission import Admission, Admit, UpdatePriority
+
+
+@pytest.mark.asyncio
+async def test_capacity_and_priority():
+    admission = Admission(capacity=1, per_user=2, queue_size=10)
+    assert await admission.acquire(1, UpdatePriority.INLINE) is Admit.ADMITTED
+    order = []
+
+    async def acquire(user_id, priority):
+        assert await admission.acquire(user_id, priority) is Admit.ADMITTED
+        order.append(priority)
+        admission.release(user_id)
+
+    waiting = asyncio.gather(
+        acquire(2, UpdatePriority.MESSAGE),
+        acquire(3, UpdatePriority.INLINE),
+        acquire(4, UpdatePriority.CHOSEN),
+    )
+    await asyncio.sleep(0)
+    assert admission.queued() == 3
+    admission.release(1)
+    await waiting
+    assert order == [
+        UpdatePriority.CHOSEN,
+        UpdatePriority.INLINE,
+        UpdatePriority.MESSAGE,
+    ]
+    assert admission.in_flight == 0
+    assert not admission.users
+
+
+@pytest.mark.asyncio
+async def test_per_user_limit():
+    admission = Admission(capacity=10, per_user=1, queue_size=10)
+    assert await admission.acquire(1, UpdatePriority.INLINE) is Admit.ADMITTED
+    assert await admission.acquire(1, UpdatePriority.INLINE) is Admit.USER_LIMIT
+    assert await admission.acquire(2, UpdatePriority.INLINE) is Admit.ADMITTED
+
+
+@pytest.mark.asyncio
+async def test_queue_full_and_timeout():
+    admission = Admission(capacity=1, per_user=0, queue_size=1)
+    await admission.acquire(1, UpdatePriority.INLINE)
+    waiting = asyncio.create_task(
+        admission.acquire(2, UpdatePriority.INLINE, max_wait=0.01)
+    )
+    await asyncio.sleep(0)
+    assert await admission.acquire(3, UpdatePriority.INLINE) is Admit.QUEUE_FULL
+    assert await waiting is Admit.TIMEOUT
+    assert admission.queued() == 0
+    assert 2 not in admission.users
+
+    admission.release(1)
+    assert admission.in_flight == 0
@@ -0,0 +1,16 @@
+from aiogram.types import InlineQueryResultArticle, InputTextMessageContent
+
+from kpoisk_bot.answers import deduplicate
+
+
+def article(id):
+    return InlineQueryResultArticle(
+        id=id,
+        title=id,
+        input_message_content=InputTextMessageContent(message_text=id),
+    )
+
+
+def test_deduplicate_keeps_first():
+    results = [article("1"), article("2"), article("1")]
+    assert [result.id for result in deduplicate(results)] == ["1", "2"]
@@ -0,0 +1,66 @@
+import sqlite3
+
+import pytest
+import pytest_asyncio
+
+from kpoisk_bot.backends import (
+    MemoryBackend,
+    RedisBackend,
+    SqliteBackend,
+    create_backend,
+    dumps,
+    loads,
+)
+
+
+def test_serialization_roundtrip():
+    data = {"filmId": 1, "nameRu": "Матрица", "genres": [{"genre": "фантастика"}]}
+    assert loads(dumps(data)) == data
+
+
+@pytest_asyncio.fixture(params=["memory", "sqlite", "redis"])
+async def backend(request, tmp_path):
+    if request.param == "memory":
+        backend = MemoryBackend()
+    elif request.param == "sqlite":
+        backend = SqliteBackend(str(tmp_path / "cache.sqlite"))
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        backend = RedisBackend("redis://localhost")
+        backend.redis = fakeredis.FakeAsyncRedis()
+    yield backend
+    await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_get_set(backend):
+    assert await backend.get("key") is None
+    await backend.set("key", b"value", 60)
+    assert await backend.get("key") == b"value"
+
+
+@pytest.mark.asyncio
+async def test_expired(backend):
+    await backend.set("key", b"value", -1)
+    assert await backend.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_sqlite_gives_up_on_locked_file(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    backend = SqliteBackend(path, timeout=0.01)
+    other = sqlite3.connect(path)
+    other.execute("BEGIN EXCLUSIVE")
+    with pytest.raises(sqlite3.OperationalError):
+        await backend.set("key", b"value", 60)
+    other.rollback()
+    other.close()
+    await backend.close()
+
+
+def test_create_backend(tmp_path):
+    assert create_backend("") is None
+    assert isinstance(create_backend("memory://"), MemoryBackend)
+    assert isinstance(create_backend(f"sqlite://{tmp_path}/cache"), SqliteBackend)
+    with pytest.raises(ValueError):
+        create_backend("ftp://example.com")
@@ -0,0 +1,36 @@
+from kpoisk_bot.bloom import BloomFilter, EmptyPrefixes
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(1000, 0.01)
+    for i in range(1000):
+        bloom.add(f"query {i}")
+    assert all(f"query {i}" in bloom for i in range(1000))
+    false_positives = sum(f"other {i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_empty_prefixes():
+    now = [0.0]
+    prefixes = EmptyPrefixes(100, 0.001, ttl=10, timer=lambda: now[0])
+    prefixes.add("qwzx")
+    # The query itself is left to the negative cache
+    assert not prefixes.covers("qwzx")
+    assert prefixes.covers("qwzxy abc")
+    assert not prefixes.covers("qwz")
+    assert prefixes.hits == 1
+
+    # Kept for one more generation, then forgotten
+    now[0] = 10
+    assert prefixes.covers("qwzx film")
+    now[0] = 20
+    assert not prefixes.covers("qwzx film")
+
+
+def test_short_prefixes_are_ignored():
+    prefixes = EmptyPrefixes(100, 0.001, ttl=10, min_length=3)
+    prefixes.add("м")
+    prefixes.add("ма")
+    assert not prefixes.covers("матрица")
+    prefixes.add("мат")
+    assert prefixes.covers("матрица")
@@ -8,6 +8,7 @@ from aiogram_tests.types.dataset import MESSAGE
 from kinopoisk_unofficial_api_client import Client
 
 from kpoisk_bot.handlers import command_start_handler, search_handler
+from kpoisk_bot.session import KinopoiskApi
 
 import httpx
 
@@ -26,9 +27,11 @@ class MyMiddleware:
     def __init__(self, httpx_client):
         self.client = Client(base_url="https://example.com")
         self.client.set_async_httpx_client(httpx_client)
+        self.api = KinopoiskApi(self.client)
 
     async def __call__(self, handler, event, data):
         data["api_client"] = self.client
+        data["api"] = self.api
         return await handler(event, data)
 
 
@@ -0,0 +1,49 @@
+from kpoisk_bot.breaker import CircuitBreaker
+
+
+class FakeTimer:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(threshold=2, reset_timeout=10, timer=FakeTimer())
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.state() == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+
+
+def test_single_trial_after_timeout():
+    timer = FakeTimer()
+    breaker = CircuitBreaker(threshold=1, reset_timeout=10, timer=timer)
+    breaker.failure()
+    timer.now = 10
+    assert breaker.state() == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.failure()
+    assert breaker.state() == CircuitBreaker.OPEN
+    timer.now = 20
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state() == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_lost_trial_is_replaced():
+    timer = FakeTimer()
+    breaker = CircuitBreaker(threshold=1, reset_timeout=10, timer=timer)
+    breaker.failure()
+    timer.now = 10
+    assert breaker.allow()
+    timer.now = 20
+    assert breaker.allow()
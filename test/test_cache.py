@@ -0,0 +1,75 @@
+from kpoisk_bot.cache import TTLCache, normalize_query
+
+
+class FakeTimer:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_normalize_query():
+    assert normalize_query("  Ёлки   ПАЛКИ ") == "елки палки"
+
+
+def test_hit_and_miss():
+    cache = TTLCache(2)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_lru_eviction():
+    cache = TTLCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats.evictions == 1
+
+
+def test_ttl_expiry():
+    timer = FakeTimer()
+    cache = TTLCache(2, ttl=10, timer=timer)
+    cache.set("a", 1)
+    timer.now = 9
+    assert cache.get("a") == 1
+    timer.now = 10
+    assert cache.get("a") is None
+    assert cache.get_stale("a") == 1
+
+
+def test_contains_does_not_count():
+    timer = FakeTimer()
+    cache = TTLCache(2, ttl=10, timer=timer)
+    cache.set("a", 1)
+    assert "a" in cache
+    timer.now = 10
+    assert "a" not in cache
+    assert (cache.stats.hits, cache.stats.misses) == (0, 0)
+
+
+def test_stale_entries_expire_for_good():
+    timer = FakeTimer()
+    cache = TTLCache(2, ttl=10, timer=timer)
+    cache.set("a", 1)
+    timer.now = 15
+    assert cache.get_stale("a", max_staleness=10) == 1
+    timer.now = 20
+    assert cache.get_stale("a", max_staleness=10) is None
+    assert len(cache) == 0
+
+
+def test_entries_and_per_entry_ttl():
+    timer = FakeTimer()
+    cache = TTLCache(3, ttl=10, timer=timer)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=-5)
+    timer.now = 4
+    assert list(cache.entries()) == [("a", 1, 6), ("b", 2, -9)]
+    assert cache.get("b") is None
+    assert cache.get_stale("b") == 2
@@ -0,0 +1,50 @@
+import httpx
+import pytest
+from aiogram.types import InlineQuery, User
+
+from kpoisk_bot.capture import TrafficLog, read_log, request_key
+
+USER = User(id=42, is_bot=False, first_name="User")
+
+
+def test_log_round_trip(tmp_path):
+    path = str(tmp_path / "traffic.log")
+    log = TrafficLog(path)
+    log.record_update(InlineQuery(id="1", from_user=USER, query="тест", offset=""))
+    log.record_update(InlineQuery(id="2", from_user=USER, query="тест", offset="5"))
+    log.close()
+
+    first, second = read_log(path)
+    assert first["kind"] == "inline"
+    assert first["query"] == "тест"
+    assert second["offset"] == "5"
+    # Anonymized, but the same user within a log
+    assert first["user"] == second["user"] != USER.id
+    assert log.records == 2
+
+
+def test_truncated_record_ends_log(tmp_path):
+    path = str(tmp_path / "traffic.log")
+    log = TrafficLog(path)
+    log.append({"kind": "message", "user": 1, "text": "тест"})
+    log.close()
+    with open(path, "ab") as f:
+        f.write(b"\x10\x00\x00\x00partial")
+    assert [record["text"] for record in read_log(path)] == ["тест"]
+
+
+@pytest.mark.asyncio
+async def test_upstream_responses_are_recorded(tmp_path, httpx_mock):
+    path = str(tmp_path / "traffic.log")
+    log = TrafficLog(path)
+    httpx_mock.add_response(json={"films": []})
+    async with httpx.AsyncClient(event_hooks=log.event_hooks()) as client:
+        await client.get(
+            "https://example.com/search", params={"page": 1, "keyword": "тест"}
+        )
+    log.close()
+
+    (record,) = read_log(path)
+    assert record["request"] == request_key("/search", {"keyword": "тест", "page": "1"})
+    assert record["status"] == 200
+    assert record["body"] == '{"films":[]}'
@@ -0,0 +1,25 @@
+import asyncio
+
+import pytest
+
+from kpoisk_bot.debounce import InlineDebouncer
+
+
+@pytest.mark.asyncio
+async def test_only_latest_query_passes():
+    debouncer = InlineDebouncer(0.01)
+    first = asyncio.create_task(debouncer.wait(1))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(debouncer.wait(1))
+    other_user = asyncio.create_task(debouncer.wait(2))
+    assert await asyncio.gather(first, second, other_user) == [False, True, True]
+    assert debouncer.superseded == 1
+
+
+@pytest.mark.asyncio
+async def test_skipped_query_supersedes_pending():
+    debouncer = InlineDebouncer(0.01)
+    pending = asyncio.create_task(debouncer.wait(1))
+    await asyncio.sleep(0)
+    debouncer.skip(1)
+    assert not await pending
@@ -0,0 +1,68 @@
+import json
+
+from kinopoisk_unofficial_api_client.models import FilmSearchResponseFilms
+
+from kpoisk_bot.decode import SearchResult, decode_search
+from kpoisk_bot.records import FilmRecord
+
+
+def search_response(films):
+    return {
+        "keyword": "тест",
+        "pagesCount": 1,
+        "searchFilmsCountResult": len(films),
+        "films": films,
+    }
+
+
+FILM = {
+    "filmId": 1,
+    "nameRu": "Тест",
+    "type": "FILM",
+    "year": "2000",
+    "rating": "7.5",
+    "ratingVoteCount": 100,
+    "genres": [{"genre": "драма"}],
+    "countries": [{"country": "США"}],
+    "posterUrl": "https://example.com/1.jpg",
+    "posterUrlPreview": "https://example.com/1_small.jpg",
+}
+
+
+def test_films_are_decoded_on_access():
+    result = decode_search(json.dumps(search_response([FILM] * 20)).encode())
+    assert result.pages_count == 1
+    assert result.films.decoded() == 0
+
+    films = result.films[:3]
+    assert all(isinstance(film, FilmRecord) for film in films)
+    assert result.films.decoded() == 3
+    assert result.films[0] is films[0]
+
+
+def test_decodes_like_the_generated_model():
+    generated = FilmRecord.from_search(FilmSearchResponseFilms.from_dict(FILM))
+    assert FilmRecord.from_dict(FILM) == generated
+
+
+def test_falls_back_on_unexpected_film():
+    odd = dict(FILM, filmLength=90)
+    result = decode_search(json.dumps(search_response([odd, FILM])).encode())
+    assert result.films[0].film_length == 90
+    assert result.films[1].film_length is None
+
+
+def test_falls_back_on_unexpected_response():
+    data = search_response([FILM])
+    data["pagesCount"] = "1"
+    result = SearchResult.from_dict(data)
+    assert result.pages_count == "1"
+    assert result.films[0] == FilmRecord.from_dict(FILM)
+
+
+def test_to_dict_keeps_the_response():
+    data = search_response([FILM, dict(FILM, filmId=2)])
+    result = SearchResult.from_dict(data)
+    assert result.to_dict() == data
+    result.films[0]
+    assert result.to_dict() == data
@@ -1,4 +1,5 @@
-from kpoisk_bot.format import FilmFormatter
+from kpoisk_bot.format import FilmFormatter, render_inline, render_text_message
+from kpoisk_bot.records import FilmRecord
 from kinopoisk_unofficial_api_client.models import FilmSearchResponseFilms, Genre
 
 from aiogram.types import (
@@ -26,11 +27,12 @@ SIMPLE_FILM = FilmSearchResponseFilms(
     rating="5.7",
     rating_vote_count=57,
 )
+SIMPLE_RECORD = FilmRecord.from_search(SIMPLE_FILM)
 
 
 @pytest.fixture
 def search_formatter() -> FilmFormatter:
-    return FilmFormatter(SIMPLE_FILM)
+    return FilmFormatter(SIMPLE_RECORD)
 
 
 def test_id(search_formatter):
@@ -150,3 +152,16 @@ def test_result_markup(search_formatter):
             ]
         ]
     )
+
+
+def test_render_inline_is_cached(search_formatter):
+    rendered = render_inline(SIMPLE_RECORD)
+    assert rendered == search_formatter.as_inline()
+    assert render_inline(SIMPLE_RECORD) is rendered
+
+
+def test_render_text_message_is_cached(search_formatter):
+    content, markup = render_text_message(SIMPLE_RECORD)
+    assert content == search_formatter.as_text_message()
+    assert markup == search_formatter.create_result_markup()
+    assert render_text_message(SIMPLE_RECORD)[0] is content
@@ -0,0 +1,12 @@
+import pytest
+
+from kpoisk_bot.health import Readiness
+
+
+@pytest.mark.asyncio
+async def test_ready_only_when_set():
+    readiness = Readiness()
+    assert (await readiness.health_view(None)).status == 200
+    assert (await readiness.ready_view(None)).status == 503
+    readiness.set_ready()
+    assert (await readiness.ready_view(None)).status == 200
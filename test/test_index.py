@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+from kpoisk_bot.index import FilmIndex
+
+
+def film(film_id, name_ru, name_en=None, votes=0):
+    return {
+        "filmId": film_id,
+        "nameRu": name_ru,
+        "nameEn": name_en,
+        "type": "FILM",
+        "ratingVoteCount": votes,
+    }
+
+
+@pytest.fixture
+def index():
+    index = FilmIndex(":memory:")
+    index.add(
+        [
+            film(1, "Матрица", "The Matrix", votes=500),
+            film(2, "Матрица: Перезагрузка", "The Matrix Reloaded", votes=300),
+            film(3, "Ёлки", votes=100),
+        ]
+    )
+    yield index
+    index.close()
+
+
+def test_prefix_search_by_popularity(index):
+    assert [f["filmId"] for f in index.search("матр", 5)] == [1, 2]
+
+
+def test_search_folds_case_and_yo(index):
+    assert [f["filmId"] for f in index.search("ЕЛКИ", 5)] == [3]
+
+
+def test_search_english_title(index):
+    assert [f["filmId"] for f in index.search("reloaded", 5)] == [2]
+
+
+def test_typo_tolerant_search(index):
+    assert [f["filmId"] for f in index.search("матрца", 1)] == [1]
+
+
+def test_exact_search(index):
+    assert index.search("матрца", 1, fuzzy=False) == []
+
+
+def test_typo_search_skips_common_trigrams(index, monkeypatch):
+    monkeypatch.setattr("kpoisk_bot.index.COMMON_TRIGRAM_TITLES", 1)
+    assert index.search("матрца", 1) == []
+
+
+def test_short_query(index):
+    assert index.search("ма", 5) == []
+
+
+def test_update_existing(index):
+    index.add([film(3, "Ёлки 2", votes=1000)])
+    assert len(index) == 3
+    assert index.search("елки", 5)[0]["nameRu"] == "Ёлки 2"
+    assert index.search("матрица", 5)[0]["filmId"] == 1
+
+
+def test_add_from_thread(tmp_path):
+    index = FilmIndex(str(tmp_path / "index.db"))
+    thread = threading.Thread(target=index.add, args=([film(1, "Матрица")],))
+    thread.start()
+    thread.join()
+    assert [f["filmId"] for f in index.search("матрица", 5)] == [1]
+    index.close()
@@ -0,0 +1,33 @@
+from kpoisk_bot.metrics import CallbackMetric, Counter, Histogram, Registry
+
+
+def test_counter_with_labels():
+    registry = Registry()
+    counter = Counter("requests_total", "Requests", registry=registry)
+    counter.inc(endpoint="search")
+    counter.inc(2, endpoint="search")
+    assert registry.render() == (
+        "# HELP requests_total Requests\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{endpoint="search"} 3\n'
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    histogram = Histogram("latency", "Latency", buckets=(0.1, 1), registry=registry)
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    lines = registry.render().splitlines()
+    assert 'latency_bucket{le="0.1"} 1' in lines
+    assert 'latency_bucket{le="1"} 2' in lines
+    assert 'latency_bucket{le="+Inf"} 2' in lines
+    assert "latency_count 2" in lines
+
+
+def test_callback_metric_and_escaping():
+    registry = Registry()
+    CallbackMetric(
+        "hits", "Hits", "counter", lambda: [({"cache": 'a"b'}, 1)], registry=registry
+    )
+    assert 'hits{cache="a\\"b"} 1' in registry.render()
@@ -0,0 +1,70 @@
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import AnswerInlineQuery, GetMe, SendMessage
+
+from kpoisk_bot.outbound import OutboundLimiter
+from kpoisk_bot.ratelimit import Priority
+
+MESSAGE = SendMessage(chat_id=1, text="hi")
+
+
+def retry_after(method, seconds):
+    return TelegramRetryAfter(
+        method, f"Too Many Requests: retry after {seconds}", seconds
+    )
+
+
+@pytest.mark.asyncio
+async def test_retry_after():
+    limiter = OutboundLimiter(rate=1000, burst=10, chat_rate=1000, chat_burst=10)
+    calls = []
+
+    async def make_request(bot, method):
+        calls.append(method)
+        if len(calls) == 1:
+            raise retry_after(method, 0)
+        return "sent"
+
+    assert await limiter(make_request, None, MESSAGE) == "sent"
+    assert len(calls) == 2
+    assert limiter.retried == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_gives_up():
+    limiter = OutboundLimiter(1000, 10, 1000, 10, attempts=2)
+
+    async def make_request(bot, method):
+        raise retry_after(method, 0)
+
+    with pytest.raises(TelegramRetryAfter):
+        await limiter(make_request, None, MESSAGE)
+    assert limiter.retried == 1
+
+
+@pytest.mark.asyncio
+async def test_chat_limit():
+    limiter = OutboundLimiter(1000, 10, chat_rate=1, chat_burst=1)
+
+    async def make_request(bot, method):
+        return "sent"
+
+    await limiter(make_request, None, MESSAGE)
+    assert limiter.chat_limiter(MESSAGE).queued() == 0
+    assert not await limiter.chat_limiter(MESSAGE).acquire(
+        Priority.CHOSEN, max_wait=0.01
+    )
+    assert limiter.chat_limiter(SendMessage(chat_id=2, text="hi")) is not None
+
+
+@pytest.mark.asyncio
+async def test_unlimited_methods_pass():
+    limiter = OutboundLimiter(1000, 10, 1000, 10)
+    limiter.limiter.pause(10)
+
+    async def make_request(bot, method):
+        return "me"
+
+    assert await limiter(make_request, None, GetMe()) == "me"
+    answer = AnswerInlineQuery(inline_query_id="1", results=[])
+    assert await limiter(make_request, None, answer) == "me"
@@ -0,0 +1,39 @@
+from kpoisk_bot.popularity import Popularity, TopK
+
+
+def test_top_k_keeps_heavy_hitters():
+    top = TopK(4)
+    for key in "aaaaabbbbcccd":
+        top.add(key)
+    top.add("e")
+    assert [key for key, _ in top.top(2)] == ["a", "b"]
+    assert top.top(4)[-1] == ("e", 2)
+    assert len(top) == 4
+
+
+def test_decay():
+    top = TopK(3)
+    top.add("a", 4)
+    top.decay()
+    assert top.top(1) == [("a", 2)]
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "popularity.json")
+    popularity = Popularity(10)
+    for _ in range(3):
+        popularity.query("  Матрица ")
+    popularity.query("ёлки")
+    popularity.chosen(301)
+
+    popularity.save(path, 1)
+    loaded = Popularity(10)
+    loaded.load(path)
+    assert loaded.queries.top(10) == [("матрица", 3)]
+    assert loaded.films.top(10) == [(301, 1)]
+
+
+def test_load_missing_file(tmp_path):
+    popularity = Popularity(10)
+    popularity.load(str(tmp_path / "missing.json"))
+    assert len(popularity.queries) == 0
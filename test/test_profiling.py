@@ -0,0 +1,45 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from kpoisk_bot.profiling import LoopWatchdog, Profiler
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_capture(tmp_path):
+    profiler = Profiler(str(tmp_path), duration=0.2, interval=0.001)
+    capture = asyncio.create_task(profiler.capture())
+    await asyncio.sleep(0.01)
+    busy(0.1)
+    with pytest.raises(RuntimeError):
+        await profiler.capture()
+    paths = await capture
+
+    names = sorted(os.path.basename(path).split("-")[0] for path in paths)
+    assert names == ["cpu", "tasks", "wall"]
+    wall = next(path for path in paths if "wall-" in path)
+    with open(wall) as f:
+        assert "busy (test_profiling.py" in f.read()
+    tasks = next(path for path in paths if "tasks-" in path)
+    with open(tasks) as f:
+        assert "test_capture" in f.read()
+    assert not profiler.running
+
+
+@pytest.mark.asyncio
+async def test_watchdog_reports_blocked_loop():
+    watchdog = LoopWatchdog(0.05)
+    heartbeat = asyncio.create_task(watchdog.heartbeat())
+    await asyncio.sleep(0.01)
+    busy(0.2)
+    await asyncio.sleep(0.01)
+    heartbeat.cancel()
+    assert watchdog.slow_callbacks == 1
@@ -0,0 +1,23 @@
+import datetime
+
+from kpoisk_bot.quota import DailyQuota
+
+
+def test_quota_rolls_over():
+    day = datetime.date(2024, 1, 1)
+    quota = DailyQuota(10, today=lambda: day)
+    quota.spend(4)
+    assert quota.remaining() == 6
+    assert quota.fraction_left() == 0.6
+    day = datetime.date(2024, 1, 2)
+    assert quota.remaining() == 10
+
+
+def test_quota_exhausted_upstream():
+    day = datetime.date(2024, 1, 1)
+    quota = DailyQuota(10, today=lambda: day)
+    quota.exhaust()
+    assert quota.remaining() == 0
+    assert quota.fraction_left() == 0
+    day = datetime.date(2024, 1, 2)
+    assert quota.remaining() == 10
@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+from kpoisk_bot.ratelimit import Priority, RateLimiter
+
+
+@pytest.mark.asyncio
+async def test_burst_is_free():
+    limiter = RateLimiter(rate=1, burst=2)
+    assert await limiter.acquire(Priority.INTERACTIVE)
+    assert await limiter.acquire(Priority.INTERACTIVE)
+    assert not await limiter.acquire(Priority.INTERACTIVE, max_wait=0.01)
+    assert limiter.limited == 1
+
+
+@pytest.mark.asyncio
+async def test_priority_order():
+    limiter = RateLimiter(rate=100, burst=1)
+    await limiter.acquire(Priority.INTERACTIVE)
+    order = []
+
+    async def acquire(priority):
+        await limiter.acquire(priority)
+        order.append(priority)
+
+    await asyncio.gather(
+        acquire(Priority.SPECULATIVE),
+        acquire(Priority.INTERACTIVE),
+        acquire(Priority.CHOSEN),
+    )
+    assert order == [Priority.CHOSEN, Priority.INTERACTIVE, Priority.SPECULATIVE]
+
+
+@pytest.mark.asyncio
+async def test_pause():
+    limiter = RateLimiter(rate=1000, burst=5)
+    limiter.pause(10)
+    assert not await limiter.acquire(Priority.CHOSEN, max_wait=0.01)
@@ -0,0 +1,89 @@
+from kinopoisk_unofficial_api_client.models import Film, FilmSearchResponseFilms
+
+from kpoisk_bot.format import FilmFormatter
+from kpoisk_bot.records import FilmRecord
+
+SEARCH_FILM = {
+    "filmId": 1,
+    "nameRu": "Тест",
+    "nameEn": "Test",
+    "type": "FILM",
+    "year": "2000",
+    "filmLength": "90",
+    "rating": "7.5",
+    "ratingVoteCount": 100,
+    "genres": [{"genre": "драма"}],
+    "countries": [{"country": "США"}],
+    "posterUrl": "https://example.com/1.jpg",
+    "posterUrlPreview": "https://example.com/1_small.jpg",
+}
+
+FILM = {
+    "kinopoiskId": 1,
+    "kinopoiskHDId": None,
+    "imdbId": None,
+    "nameRu": "Тест",
+    "nameEn": None,
+    "nameOriginal": "Test",
+    "posterUrl": "https://example.com/1.jpg",
+    "posterUrlPreview": "https://example.com/1_small.jpg",
+    "coverUrl": None,
+    "logoUrl": None,
+    "reviewsCount": 0,
+    "ratingGoodReview": None,
+    "ratingGoodReviewVoteCount": None,
+    "ratingKinopoisk": 7.5,
+    "ratingKinopoiskVoteCount": 100,
+    "ratingImdb": None,
+    "ratingImdbVoteCount": None,
+    "ratingFilmCritics": None,
+    "ratingFilmCriticsVoteCount": None,
+    "ratingAwait": None,
+    "ratingAwaitCount": None,
+    "ratingRfCritics": None,
+    "ratingRfCriticsVoteCount": None,
+    "webUrl": "https://www.kinopoisk.ru/film/1/",
+    "year": 2000,
+    "filmLength": 90,
+    "slogan": None,
+    "description": None,
+    "shortDescription": None,
+    "editorAnnotation": None,
+    "isTicketsAvailable": False,
+    "productionStatus": None,
+    "type": "FILM",
+    "ratingMpaa": None,
+    "ratingAgeLimits": None,
+    "hasImax": False,
+    "has3D": False,
+    "lastSync": "2024-01-01T00:00:00.000000",
+    "countries": [{"country": "США"}],
+    "genres": [{"genre": "драма"}],
+    "startYear": None,
+    "endYear": None,
+    "serial": False,
+    "shortFilm": False,
+    "completed": True,
+}
+
+
+def test_search_and_details_normalize_alike():
+    from_search = FilmRecord.from_search(FilmSearchResponseFilms.from_dict(SEARCH_FILM))
+    from_film = FilmRecord.from_film(Film.from_dict(FILM))
+    assert from_search == from_film
+    assert (
+        FilmFormatter(from_search).as_text_message()
+        == FilmFormatter(from_film).as_text_message()
+    )
+
+
+def test_null_values():
+    record = FilmRecord.from_dict(dict(SEARCH_FILM, year="null", rating="null"))
+    assert record.year is None
+    assert FilmFormatter(record).get_rating() is None
+
+
+def test_dict_round_trip():
+    record = FilmRecord.from_dict(SEARCH_FILM)
+    assert record.to_dict() == SEARCH_FILM
+    assert FilmRecord.from_dict(record.to_dict()) == record
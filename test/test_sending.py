@@ -0,0 +1,40 @@
+import pytest
+from aiogram.types import InputTextMessageContent, MessageEntity
+
+from kpoisk_bot.sending import combine_messages, send_all
+
+FIRST = InputTextMessageContent(
+    message_text="🎬 one",
+    entities=[MessageEntity(type="bold", offset=3, length=3)],
+)
+SECOND = InputTextMessageContent(
+    message_text="two",
+    entities=[MessageEntity(type="italic", offset=0, length=3)],
+)
+
+
+def test_combine_shifts_entities():
+    (combined,) = combine_messages([FIRST, SECOND])
+    assert combined.message_text == "🎬 one\n\ntwo"
+    # The emoji takes two UTF-16 code units
+    assert combined.entities == [
+        MessageEntity(type="bold", offset=3, length=3),
+        MessageEntity(type="italic", offset=8, length=3),
+    ]
+
+
+def test_combine_respects_limit():
+    assert combine_messages([FIRST, SECOND], limit=10) == [FIRST, SECOND]
+
+
+@pytest.mark.asyncio
+async def test_send_all_isolates_failures():
+    async def sent():
+        return "sent"
+
+    async def broken():
+        raise RuntimeError("broken")
+
+    results = await send_all([sent, broken], concurrency=2)
+    assert results[0] == "sent"
+    assert isinstance(results[1], RuntimeError)
@@ -0,0 +1,119 @@
+import asyncio
+import re
+
+import httpx
+import pytest
+import pytest_asyncio
+from kinopoisk_unofficial_api_client import Client
+
+from kpoisk_bot.breaker import CircuitOpen
+from kpoisk_bot.ratelimit import Priority
+from kpoisk_bot.session import KinopoiskApi, Refused, flight_key
+
+
+def search_page(page, count, pages_count=2, total=25):
+    return {
+        "films": [
+            {"filmId": page * 100 + i, "nameRu": "ru", "type": "FILM"}
+            for i in range(count)
+        ],
+        "keyword": "тест",
+        "pagesCount": pages_count,
+        "searchFilmsCountResult": total,
+    }
+
+
+@pytest_asyncio.fixture
+async def api():
+    async with httpx.AsyncClient(base_url="https://example.com") as httpx_client:
+        client = Client(base_url="https://example.com")
+        client.set_async_httpx_client(httpx_client)
+        api = KinopoiskApi(client)
+        yield api
+        await api.close()
+
+
+@pytest.mark.asyncio
+async def test_search_is_cached_by_normalized_query(api, httpx_mock):
+    httpx_mock.add_response(json=search_page(1, 3, pages_count=1, total=3))
+    first = await api.search("Тест")
+    assert await api.search("  тест ") is first
+    assert len(httpx_mock.get_requests()) == 1
+
+
+@pytest.mark.asyncio
+async def test_search_slice_crosses_pages(api, httpx_mock):
+    httpx_mock.add_response(url=re.compile(r".*page=1(&|$)"), json=search_page(1, 20))
+    httpx_mock.add_response(url=re.compile(r".*page=2(&|$)"), json=search_page(2, 5))
+    films, next_offset = await api.search_slice("тест", 15, 10)
+    assert [film.film_id for film in films] == [*range(115, 120), *range(200, 205)]
+    assert next_offset is None
+
+    films, next_offset = await api.search_slice("тест", 0, 5)
+    assert [film.film_id for film in films] == [*range(100, 105)]
+    assert next_offset == 5
+    assert len(httpx_mock.get_requests()) == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_search_is_served_while_refreshing(api, httpx_mock):
+    httpx_mock.add_response(json=search_page(1, 3, pages_count=1, total=3))
+    first = await api.search("тест")
+    api.search_cache.ttl = 0
+    api.search_cache.set(("тест", 1), first)
+
+    httpx_mock.add_response(json=search_page(2, 3, pages_count=1, total=3))
+    assert await api.search("тест") is first
+    await asyncio.gather(*api._tasks)
+    assert api.stale_served == 1
+    assert api.search_cache.get_stale(("тест", 1)).films[0].film_id == 200
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_on_failures(api, httpx_mock):
+    for _ in range(api.breakers["film"].threshold):
+        httpx_mock.add_response(status_code=500)
+    for film_id in range(api.breakers["film"].threshold):
+        with pytest.raises(httpx.HTTPError):
+            await api.get_film(film_id)
+    with pytest.raises(CircuitOpen):
+        await api.get_film(100)
+    assert len(httpx_mock.get_requests()) == api.breakers["film"].threshold
+
+
+@pytest.mark.asyncio
+async def test_empty_prefix_short_circuits(api, httpx_mock):
+    httpx_mock.add_response(json=search_page(1, 0, pages_count=0, total=0))
+    assert not (await api.search("qwzx")).films
+    assert api.search_cache.get_stale(("qwzx", 1)) is not None
+
+    result = await api.search("qwzx film")
+    assert not result.films
+    assert api.empty_prefixes.hits == 1
+    assert len(httpx_mock.get_requests()) == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_film_is_cached(api, httpx_mock):
+    httpx_mock.add_response(status_code=404)
+    assert await api.get_film(1) is None
+    assert await api.get_film(1) is None
+    assert api.missing_film_hits == 1
+    assert len(httpx_mock.get_requests()) == 1
+
+
+@pytest.mark.asyncio
+async def test_spent_quota_is_an_error(api, httpx_mock):
+    httpx_mock.add_response(status_code=402)
+    with pytest.raises(Refused):
+        await api.search("тест")
+    assert api.quota.remaining() == 0
+    assert api.prefetch_budget() == 0
+    assert api.search_cache.get_stale(("тест", 1)) is None
+
+
+def test_chosen_calls_dont_join_speculative_flights():
+    key = ("film", 1)
+    assert flight_key(key, Priority.CHOSEN) == key
+    assert flight_key(key, Priority.INTERACTIVE) == key
+    assert flight_key(key, Priority.SPECULATIVE) != key
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from kpoisk_bot.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    started = 0
+
+    async def fetch():
+        nonlocal started
+        started += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*[flight.do("key", fetch) for _ in range(5)])
+    assert results == ["result"] * 5
+    assert started == 1
+    assert (flight.calls, flight.coalesced) == (1, 4)
+    assert len(flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_shares_exception():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        flight.do("key", fail), flight.do("key", fail), return_exceptions=True
+    )
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_waiter_takes_over_cancelled_call():
+    flight = SingleFlight()
+    started = 0
+
+    async def fetch():
+        nonlocal started
+        started += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    leader = asyncio.create_task(flight.do("key", fetch))
+    await asyncio.sleep(0)
+    followers = [asyncio.create_task(flight.do("key", fetch)) for _ in range(2)]
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await asyncio.gather(*followers) == ["result"] * 2
+    assert started == 2
+    assert leader.cancelled()
@@ -0,0 +1,51 @@
+import time
+
+from kpoisk_bot.backends import dumps
+from kpoisk_bot.cache import TTLCache
+from kpoisk_bot.decode import SearchResult
+from kpoisk_bot.records import FilmRecord
+from kpoisk_bot.snapshot import load_snapshot, save_snapshot
+
+FILM = {"filmId": 1, "nameRu": "Тест", "type": "FILM"}
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "snapshot")
+    search_cache = TTLCache(10, 60)
+    film_cache = TTLCache(10, 60)
+    search_cache.set(
+        ("тест", 1),
+        SearchResult.from_dict({"pagesCount": 1, "films": [FILM]}),
+    )
+    film_cache.set(1, FilmRecord.from_dict(FILM))
+    film_cache.set(2, FilmRecord.from_dict(dict(FILM, filmId=2)), ttl=-120)
+    save_snapshot(path, search_cache, film_cache)
+
+    search_cache, film_cache = TTLCache(10, 60), TTLCache(10, 60)
+    assert load_snapshot(path, search_cache, film_cache, max_staleness=30) == 2
+    assert search_cache.get(("тест", 1)).films[0] == FilmRecord.from_dict(FILM)
+    assert film_cache.get(1) == FilmRecord.from_dict(FILM)
+    assert film_cache.get_stale(2) is None
+
+
+def test_expired_while_stopped(tmp_path, monkeypatch):
+    path = str(tmp_path / "snapshot")
+    film_cache = TTLCache(10, 60)
+    film_cache.set(1, FilmRecord.from_dict(FILM))
+    save_snapshot(path, TTLCache(10), film_cache)
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 70)
+    film_cache = TTLCache(10, 60)
+    assert load_snapshot(path, TTLCache(10), film_cache, max_staleness=30) == 1
+    assert film_cache.get(1) is None
+    assert film_cache.get_stale(1) == FilmRecord.from_dict(FILM)
+
+
+def test_missing_or_broken_snapshot(tmp_path):
+    path = tmp_path / "snapshot"
+    assert load_snapshot(str(path), TTLCache(10), TTLCache(10), 0) == 0
+    path.write_bytes(b"")
+    assert load_snapshot(str(path), TTLCache(10), TTLCache(10), 0) == 0
+    path.write_bytes(dumps({"saved": time.time()}))
+    assert load_snapshot(str(path), TTLCache(10), TTLCache(10), 0) == 0
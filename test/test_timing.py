@@ -0,0 +1,35 @@
+import httpx
+import pytest
+from aiohttp import web
+
+from kpoisk_bot.timing import RequestTimings
+
+
+@pytest.mark.asyncio
+async def test_timings_against_local_server(unused_tcp_port):
+    async def ok(request):
+        return web.json_response({"films": []})
+
+    app = web.Application()
+    app.router.add_get("/", ok)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", unused_tcp_port)
+    await site.start()
+
+    timings = RequestTimings()
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{unused_tcp_port}",
+            event_hooks=timings.event_hooks(),
+        ) as client:
+            for _ in range(3):
+                assert (await client.get("/")).status_code == 200
+    finally:
+        await runner.cleanup()
+
+    # The connection is kept alive, so it is opened only once
+    assert timings.phases["connect"].count == 1
+    assert timings.phases["ttfb"].count == 3
+    assert timings.phases["total"].count == 3
+    assert "ttfb" in timings.summary()